@@ -0,0 +1,131 @@
+"""
+Kevin Bacon Path Service Load Generator
+
+Sends path queries to a running bacon_service from many concurrent
+connections and reports the p50/p99 latency and throughput.
+
+Run with: python bacon_loadgen.py --port 8765 --connections 50
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+# The actors queried by kevin_bacon.run
+END_PEOPLE = ['Amy Adams', 'Andrew Garfield', 'Anne Hathaway', 'Barack Obama',
+              'Benedict Cumberbatch', 'Chris Pine', 'Daniel Radcliffe',
+              'Jennifer Aniston', 'Joseph Gordon-Levitt', 'Morgan Freeman',
+              'Sandra Bullock', 'Tina Fey']
+
+def percentile(values, fraction):
+    """
+    Computes a percentile by the nearest-rank method.
+
+    inputs:
+        - values: a sorted, non-empty list of numbers
+        - fraction: a number between 0 and 1
+
+    returns: the smallest value that is at least fraction of values.
+    """
+    # Round away float error first, so that e.g. 0.07 * 100 is rank 7
+    rank = max(1, math.ceil(round(fraction * len(values), 9)))
+    return values[min(rank, len(values)) - 1]
+
+async def run_client(host, port, requests, latencies):
+    """
+    Sends requests one after another over a single connection, recording
+    the latency of each.
+
+    inputs:
+        - host: a string representing the address of the service
+        - port: an integer representing the port of the service
+        - requests: a list of request dictionaries
+        - latencies: a list to append each latency in seconds to
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            before = time.perf_counter()
+            writer.write((json.dumps(request) + "\n").encode("utf-8"))
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - before)
+            if "error" in response:
+                print("Error for %s: %s" % (request, response["error"]))
+    finally:
+        writer.close()
+
+async def generate_load(host, port, num_connections, requests_per_connection,
+                        start_people, end_people, seed=None):
+    """
+    Sends random queries from many concurrent connections.
+
+    inputs:
+        - host: a string representing the address of the service
+        - port: an integer representing the port of the service
+        - num_connections: an integer representing the number of
+          concurrent connections
+        - requests_per_connection: an integer representing the number of
+          requests sent by each connection
+        - start_people: a list of start actors to choose from
+        - end_people: a list of end actors to choose from
+        - seed: a seed for choosing the queries
+
+    returns: a dictionary with the number of requests, the elapsed time,
+    the throughput in requests per second and the p50 and p99 latencies
+    in seconds (None if no requests were sent).
+    """
+    rng = random.Random(seed)
+    latencies = []
+    clients = []
+    for connection in range(num_connections):
+        requests = []
+        for idx in range(requests_per_connection):
+            requests.append({"id": connection * requests_per_connection + idx,
+                             "start": rng.choice(start_people),
+                             "end": rng.choice(end_people)})
+        clients.append(run_client(host, port, requests, latencies))
+    before = time.perf_counter()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - before
+    latencies.sort()
+    if len(latencies) == 0:
+        return {"requests": 0, "elapsed": elapsed, "throughput": 0.0,
+                "p50": None, "p99": None}
+    return {"requests": len(latencies),
+            "elapsed": elapsed,
+            "throughput": len(latencies) / elapsed,
+            "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99)}
+
+def main():
+    """
+    Parse the command line, generate load and print the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20,
+                        help="requests per connection")
+    parser.add_argument("--start", action="append",
+                        help="a start actor (may be repeated)")
+    parser.add_argument("--end", action="append",
+                        help="an end actor (may be repeated)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    results = asyncio.run(generate_load(args.host, args.port, args.connections,
+                                        args.requests,
+                                        args.start or ['Kevin Bacon'],
+                                        args.end or END_PEOPLE, args.seed))
+    print("%d requests in %.2f s (%.1f requests/second)" % (
+        results["requests"], results["elapsed"], results["throughput"]))
+    if results["requests"] > 0:
+        print("p50 latency: %.2f ms" % (results["p50"] * 1000))
+        print("p99 latency: %.2f ms" % (results["p99"] * 1000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Kevin Bacon Path Service
+
+A local asyncio server that answers "how is X connected to Y" queries
+over a line protocol.  Each request is one line of JSON,
+
+    {"id": 1, "start": "Kevin Bacon", "end": "Amy Adams"}
+
+and each response is one line of JSON,
+
+    {"id": 1, "start": "Kevin Bacon", "end": "Amy Adams",
+     "path": [["Kevin Bacon", ["Movie"]], ..., ["Amy Adams", []]]}
+
+with the same [(actor, {movies}), ...] steps as kevin_bacon.find_path
+(an empty path means there is no connection), or an "error" key.
+
+The graph stays loaded in a pool of worker processes, so searches never
+block the event loop.  Requests that share a start actor and arrive
+within a short window are answered by a single search.
+
+Run with: python bacon_service.py --graph subgraph5000 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+import comp140_module4 as movies
+import kevin_bacon
+
+# The graph searched by the current worker process, loaded once by
+# _init_worker
+_worker = {}
+
+def _init_worker(graph_name):
+    """
+    Loads the graph searched by a worker process.
+    """
+    _worker["graph"] = movies.load_graph(graph_name)
+    _worker["actors"] = set(_worker["graph"].nodes())
+
+def _search_paths(start_person, end_people):
+    """
+    Finds the paths from start_person to each of end_people with one
+    search in the current worker.
+
+    inputs:
+        - start_person: a string representing the name of the start actor
+        - end_people: a list of strings representing actor names
+
+    returns: a dictionary mapping each of end_people to their path as
+    a list of [actor, [movies]] pairs, ready to be sent as JSON, or to
+    None if they are not in the graph.  Raises KeyError if start_person
+    is not in the graph.
+    """
+    graph = _worker["graph"]
+    actors = _worker["actors"]
+    if start_person not in actors:
+        raise KeyError(start_person)
+    # Unknown actors would only make the search scan the whole graph
+    known_people = [end_person for end_person in end_people if end_person in actors]
+    parents = kevin_bacon.targeted_bfs(graph, start_person, known_people)[1]
+    paths = {}
+    for end_person in end_people:
+        if end_person not in actors:
+            paths[end_person] = None
+            continue
+        path = kevin_bacon.find_path(graph, start_person, end_person, parents)
+        paths[end_person] = [[actor, sorted(movie_set)] for actor, movie_set in path]
+    return paths
+
+class BaconService:
+    """
+    Answers path queries, batching those that share a start actor.
+    """
+
+    def __init__(self, pool, batch_window=0.005):
+        """
+        Create a service that searches in the given pool.
+
+        inputs:
+            - pool: a ProcessPoolExecutor whose workers were initialized
+              with _init_worker
+            - batch_window: the number of seconds to collect requests for
+              the same start actor before searching
+        """
+        self._pool = pool
+        self._batch_window = batch_window
+        self._pending = {}
+
+    async def find_path(self, start_person, end_person):
+        """
+        Finds the path from start_person to end_person.
+
+        inputs:
+            - start_person: a string representing the name of the start actor
+            - end_person: a string representing the name of the end actor
+
+        returns: the path as a list of [actor, [movies]] pairs.  Raises
+        KeyError if either actor is not in the graph.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if start_person not in self._pending:
+            self._pending[start_person] = []
+            loop.call_later(self._batch_window, self._flush, start_person)
+        self._pending[start_person].append((end_person, future))
+        return await future
+
+    def _flush(self, start_person):
+        """
+        Starts one search for every request collected for start_person.
+        """
+        batch = self._pending.pop(start_person)
+        end_people = sorted(set(end_person for end_person, _ in batch))
+        loop = asyncio.get_running_loop()
+        search = loop.run_in_executor(self._pool, _search_paths,
+                                      start_person, end_people)
+
+        def deliver(search):
+            """
+            Hands the result of the search to every waiting request.
+            """
+            for end_person, future in batch:
+                if future.cancelled():
+                    continue
+                if search.exception() is not None:
+                    future.set_exception(search.exception())
+                elif search.result()[end_person] is None:
+                    future.set_exception(KeyError(end_person))
+                else:
+                    future.set_result(search.result()[end_person])
+        search.add_done_callback(deliver)
+
+    async def _answer(self, line, writer):
+        """
+        Answers a single request line.
+        """
+        response = {}
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id")
+            response["start"] = request["start"]
+            response["end"] = request["end"]
+            response["path"] = await self.find_path(request["start"], request["end"])
+        except KeyError as error:
+            response["error"] = "unknown actor or missing field: %s" % error
+        except (ValueError, AttributeError, TypeError) as error:
+            response["error"] = "bad request: %s" % error
+        writer.write((json.dumps(response) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        """
+        Serves one connection.  Requests may be pipelined, so responses
+        can arrive out of order and should be matched up by "id".
+        """
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if len(tasks) > 0:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+async def serve(graph_name, host="127.0.0.1", port=8765, num_workers=None,
+                batch_window=0.005):
+    """
+    Runs the service until it is cancelled.
+
+    inputs:
+        - graph_name: a string representing the name of the graph to load,
+          as accepted by movies.load_graph
+        - host: a string representing the address to listen on
+        - port: an integer representing the port to listen on
+        - num_workers: an integer representing the number of worker
+          processes, or None to use one per CPU
+        - batch_window: the number of seconds to collect requests for
+          the same start actor before searching
+    """
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                             initargs=(graph_name,)) as pool:
+        service = BaconService(pool, batch_window)
+        server = await asyncio.start_server(service.handle_client, host, port)
+        async with server:
+            print("Serving %s on %s:%d" % (graph_name, host, port))
+            await server.serve_forever()
+
+def main():
+    """
+    Parse the command line and run the service.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--graph", default="subgraph5000")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(serve(args.graph, args.host, args.port, args.workers,
+                      args.batch_window))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Actor Centrality
+
+Betweenness (Brandes' algorithm) and closeness centrality for the
+movie graphs of the Kevin Bacon Game, computed over a CompactGraph.
+"""
+
+import math
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import kevin_bacon
+
+# Per-process state for centrality workers, set once by _init_worker so
+# the graph is not sent with every chunk
+_worker = {}
+
+def _init_worker(cgraph):
+    """
+    Stores the CompactGraph searched by a centrality worker process.
+    """
+    _worker["cgraph"] = cgraph
+
+def _chunk_centrality(sources):
+    """
+    Runs one Brandes search per source in the current worker.
+
+    input:
+        - sources: a list of actor ids
+
+    returns: a three-element tuple of arrays indexed by actor id,
+    holding the summed pair dependencies of each actor, the summed
+    distances from the sources to each actor and the number of sources
+    (other than itself) that reach each actor.
+    """
+    cgraph = _worker["cgraph"]
+    num_nodes = len(cgraph)
+    offsets = cgraph.offsets
+    targets = cgraph.targets
+    dependency_sum = array("d", [0.0]) * num_nodes
+    distance_sum = array("d", [0.0]) * num_nodes
+    reach_count = array("i", [0]) * num_nodes
+
+    for source in sources:
+        # Breadth-first search counting shortest paths (sigma) and
+        # recording the order in which actors are reached
+        dist = array("i", [-1]) * num_nodes
+        sigma = array("d", [0.0]) * num_nodes
+        dist[source] = 0
+        sigma[source] = 1.0
+        order = [source]
+        idx = 0
+        while idx < len(order):
+            node = order[idx]
+            idx += 1
+            next_dist = dist[node] + 1
+            for nbr in targets[offsets[node]:offsets[node + 1]]:
+                if dist[nbr] < 0:
+                    dist[nbr] = next_dist
+                    order.append(nbr)
+                if dist[nbr] == next_dist:
+                    sigma[nbr] += sigma[node]
+
+        # Accumulate dependencies in order of decreasing distance.  The
+        # predecessors of an actor are the neighbors one step closer,
+        # so they are found from the adjacency instead of being stored.
+        delta = array("d", [0.0]) * num_nodes
+        for node in reversed(order):
+            prev_dist = dist[node] - 1
+            coefficient = (1.0 + delta[node]) / sigma[node]
+            for nbr in targets[offsets[node]:offsets[node + 1]]:
+                if dist[nbr] == prev_dist:
+                    delta[nbr] += sigma[nbr] * coefficient
+            if node != source:
+                dependency_sum[node] += delta[node]
+                distance_sum[node] += dist[node]
+                reach_count[node] += 1
+    return (dependency_sum, distance_sum, reach_count)
+
+def centrality(graph, num_samples=None, num_workers=None, chunk_size=32,
+               confidence=0.95, seed=None):
+    """
+    Computes the betweenness and closeness centrality of every actor.
+
+    Betweenness is exact when searching from every actor (practical on
+    subgraphs).  With num_samples, it is estimated from that many random
+    source actors, as is closeness from the distances to them.  Error
+    bounds that hold for every actor at once, with the given confidence,
+    are returned alongside.  The searches are split into chunks across a
+    pool of worker processes.
+
+    inputs:
+        - graph: a graph object or a CompactGraph
+        - num_samples: a positive integer representing the number of
+          source actors to sample, or None to search from every actor
+        - num_workers: an integer representing the number of worker
+          processes, None to use one per CPU, or 1 to compute everything
+          in this process
+        - chunk_size: an integer representing the number of searches per
+          task
+        - confidence: the probability with which the error bounds hold
+        - seed: a seed for choosing the sample
+
+    returns: a dictionary with the keys
+        - "betweenness": a dictionary associating each actor with their
+          betweenness, normalized to lie between 0 and 1
+        - "closeness": a dictionary associating each actor with their
+          closeness (Wasserman-Faust, so that actors in small components
+          score low), or 0 if they reach no one
+        - "betweenness_error": the largest error of any normalized
+          betweenness value (0 when exact)
+        - "average_distance_error": the largest error of any actor's
+          estimated average distance, the inverse of closeness within a
+          connected graph (0 when exact)
+        - "num_sources": the number of sources searched from
+
+    Raises ValueError if num_samples is less than 1.
+    """
+    if num_samples is not None and num_samples < 1:
+        raise ValueError("num_samples must be at least 1")
+    if isinstance(graph, kevin_bacon.CompactGraph):
+        cgraph = graph
+    else:
+        cgraph = kevin_bacon.CompactGraph(graph)
+    num_nodes = len(cgraph)
+    sources = list(range(num_nodes))
+    if num_samples is not None and num_samples < num_nodes:
+        sources = random.Random(seed).sample(sources, num_samples)
+    chunks = [sources[idx:idx + chunk_size]
+              for idx in range(0, len(sources), chunk_size)]
+
+    dependency_sum = array("d", [0.0]) * num_nodes
+    distance_sum = array("d", [0.0]) * num_nodes
+    reach_count = array("i", [0]) * num_nodes
+    def merge(result):
+        """
+        Adds the result of one chunk to the running totals.
+        """
+        for node in range(num_nodes):
+            dependency_sum[node] += result[0][node]
+            distance_sum[node] += result[1][node]
+            reach_count[node] += result[2][node]
+
+    if num_workers == 1:
+        _init_worker(cgraph)
+        for chunk in chunks:
+            merge(_chunk_centrality(chunk))
+        _worker.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_worker,
+                                 initargs=(cgraph,)) as pool:
+            futures = [pool.submit(_chunk_centrality, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                merge(future.result())
+
+    num_sources = len(sources)
+    sample_set = set(sources)
+    betweenness = {}
+    closeness = {}
+    for node in range(num_nodes):
+        name = cgraph.get_name(node)
+        # Scale the sampled dependencies up to all n sources and divide
+        # by the number of ordered pairs that node could lie between
+        if num_nodes > 2:
+            betweenness[name] = (dependency_sum[node] * num_nodes / num_sources /
+                                 ((num_nodes - 1) * (num_nodes - 2)))
+        else:
+            betweenness[name] = 0.0
+        if reach_count[node] == 0:
+            closeness[name] = 0.0
+        else:
+            other_sources = num_sources - (node in sample_set)
+            reached_fraction = reach_count[node] / other_sources
+            average_distance = distance_sum[node] / reach_count[node]
+            closeness[name] = reached_fraction / average_distance
+
+    betweenness_error = 0.0
+    average_distance_error = 0.0
+    if num_sources < num_nodes and num_nodes > 1:
+        # Hoeffding's inequality, with a union bound over every actor;
+        # each sampled source contributes a value in [0, n / (n - 1)]
+        # to the normalized betweenness, and in [0, diameter] to the
+        # average distance
+        spread = math.sqrt(math.log(2 * num_nodes / (1 - confidence)) /
+                           (2 * num_sources))
+        betweenness_error = num_nodes / (num_nodes - 1) * spread
+        diameter = 0
+        for source in sources[:1]:
+            diameter = max(kevin_bacon.compact_bfs(cgraph, source)[0])
+        # Any actor's eccentricity is at least half the diameter
+        average_distance_error = 2 * diameter * spread
+    return {"betweenness": betweenness,
+            "closeness": closeness,
+            "betweenness_error": betweenness_error,
+            "average_distance_error": average_distance_error,
+            "num_sources": num_sources}
@@ -0,0 +1,337 @@
+"""
+GF(256) Arithmetic
+
+Table-driven arithmetic in the finite field Z_256 used by QR code
+Reed-Solomon error correction: polynomials over Z_2 modulo
+x^8 + x^4 + x^3 + x^2 + 1, with 2 as the generator.
+
+Besides single numbers, whole rows of numbers (any bytes-like object)
+can be added, scaled or multiplied at once.  Row operations run in C
+through bytes.translate, map over precomputed tables and big-integer
+XOR, rather than with one Python call per number.
+"""
+
+from operator import add as _int_add, mul as _int_mul
+from itertools import repeat
+
+# The reduction polynomial x^8 + x^4 + x^3 + x^2 + 1
+PRIMITIVE = 0x11d
+
+def _build_tables():
+    """
+    Computes the exponential and logarithm tables.
+
+    Returns: a two-element tuple containing a bytes object of length
+    512 in which entry i is 2^i (repeated so that sums of two
+    logarithms never need reducing) and a list in which entry a is the
+    logarithm of a (entry 0 is unused).
+    """
+    exp = bytearray(512)
+    log = [0] * 256
+    value = 1
+    for power in range(255):
+        exp[power] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= PRIMITIVE
+    for power in range(255, 512):
+        exp[power] = exp[power - 255]
+    return bytes(exp), log
+
+EXP, LOG = _build_tables()
+
+def add(num1, num2):
+    """
+    Returns: the sum of two Z_256 numbers.
+    """
+    return num1 ^ num2
+
+def sub(num1, num2):
+    """
+    Returns: the difference of two Z_256 numbers, which is the same as
+    their sum.
+    """
+    return num1 ^ num2
+
+def mul(num1, num2):
+    """
+    Returns: the product of two Z_256 numbers.
+    """
+    if num1 == 0 or num2 == 0:
+        return 0
+    return EXP[LOG[num1] + LOG[num2]]
+
+def div(num1, num2):
+    """
+    Returns: the quotient of two Z_256 numbers.  Raises
+    ZeroDivisionError if num2 is 0.
+    """
+    if num2 == 0:
+        raise ZeroDivisionError("division by zero in Z_256")
+    if num1 == 0:
+        return 0
+    return EXP[LOG[num1] - LOG[num2] + 255]
+
+def power(num, exponent):
+    """
+    Returns: num raised to the (integer) exponent.  Raises
+    ZeroDivisionError if num is 0 and exponent is negative.
+    """
+    if num == 0:
+        if exponent < 0:
+            raise ZeroDivisionError("0 has no inverse in Z_256")
+        return 0 if exponent > 0 else 1
+    return EXP[(LOG[num] * exponent) % 255]
+
+def inverse(num):
+    """
+    Returns: the multiplicative inverse of a non-zero Z_256 number.
+    """
+    return div(1, num)
+
+# Row i of the multiplication table maps every number x to i*x; it is
+# built on first use (64 KiB)
+_mul_rows = []
+_mul_flat = []
+
+def multiplication_table():
+    """
+    Returns: a list of 256 bytes objects in which entry c is the
+    translation table mapping every Z_256 number x to c*x.
+    """
+    if len(_mul_rows) == 0:
+        for coefficient in range(256):
+            _mul_rows.append(bytes(mul(coefficient, num) for num in range(256)))
+        _mul_flat.append(b"".join(_mul_rows))
+    return _mul_rows
+
+def scale_row(row, coefficient):
+    """
+    Multiplies every number in a row by a coefficient.
+
+    inputs:
+        - row: a bytes-like object of Z_256 numbers
+        - coefficient: a Z_256 number
+
+    Returns: a bytes object of the products.
+    """
+    if coefficient == 0:
+        return bytes(len(row))
+    if coefficient == 1:
+        return bytes(row)
+    return bytes(row).translate(multiplication_table()[coefficient])
+
+def add_rows(row1, row2):
+    """
+    Adds two rows of Z_256 numbers element by element.
+
+    inputs:
+        - row1: a bytes-like object of Z_256 numbers
+        - row2: a bytes-like object of Z_256 numbers of the same length
+
+    Returns: a bytes object of the sums.
+    """
+    total = int.from_bytes(row1, "big") ^ int.from_bytes(row2, "big")
+    return total.to_bytes(len(row1), "big")
+
+sub_rows = add_rows
+
+def multiply_rows(row1, row2):
+    """
+    Multiplies two rows of Z_256 numbers element by element.
+
+    inputs:
+        - row1: a bytes-like object of Z_256 numbers
+        - row2: a bytes-like object of Z_256 numbers of the same length
+
+    Returns: a bytes object of the products.
+    """
+    multiplication_table()
+    # Entry 256*a + b of the flat table is a*b
+    indices = map(_int_add, map(_int_mul, row1, repeat(256)), row2)
+    return bytes(map(_mul_flat[0].__getitem__, indices))
+
+# The numbers of error correction bytes per block used by QR versions
+# 1 through 40 at any error correction level
+QR_ECC_LENGTHS = (7, 10, 13, 15, 16, 17, 18, 20, 22, 24, 26, 28, 30)
+
+# Generator polynomials already built, mapping each number of error
+# correction bytes to its coefficients (seeded from rs_generators) and
+# to its coefficients in log form
+_generators = {}
+_generator_logs = {}
+
+def _build_generator(num_correction_bytes):
+    """
+    Multiplies out the Reed-Solomon generator polynomial, the product of
+    (x - 2^i) for all i in {0, 1, ..., num_correction_bytes - 1}.
+
+    Returns: a bytes object of its coefficients, highest power first.
+    """
+    coeffs = b"\x01"
+    for idx in range(num_correction_bytes):
+        # (g * x) + (2^idx * g), aligned on the highest power
+        coeffs = add_rows(coeffs + b"\x00",
+                          b"\x00" + scale_row(coeffs, EXP[idx]))
+    return coeffs
+
+def generator(num_correction_bytes):
+    """
+    Looks up the Reed-Solomon generator polynomial for a number of error
+    correction bytes, building and remembering it on first use.
+
+    inputs:
+        - num_correction_bytes: an integer representing the number of
+          error correction bytes (k)
+
+    Returns: a bytes object of length k + 1 holding the coefficients of
+    the generator, highest power first (so entry 0 is always 1).
+    """
+    coeffs = _generators.get(num_correction_bytes)
+    if coeffs is None:
+        coeffs = _build_generator(num_correction_bytes)
+        _generators[num_correction_bytes] = coeffs
+    return coeffs
+
+def generator_logs(num_correction_bytes):
+    """
+    Looks up the Reed-Solomon generator polynomial in log form.
+
+    inputs:
+        - num_correction_bytes: an integer representing the number of
+          error correction bytes (k)
+
+    Returns: a bytes object of length k + 1 in which entry i is the
+    logarithm of entry i of generator(num_correction_bytes), or 255 for
+    a zero coefficient.
+    """
+    logs = _generator_logs.get(num_correction_bytes)
+    if logs is None:
+        logs = bytes(LOG[coeff] if coeff != 0 else 255
+                     for coeff in generator(num_correction_bytes))
+        _generator_logs[num_correction_bytes] = logs
+    return logs
+
+def write_generator_module(filename="rs_generators.py",
+                           lengths=QR_ECC_LENGTHS):
+    """
+    Writes a module holding pregenerated generator polynomials, so that
+    importing this module does not have to build them.
+
+    inputs:
+        - filename: a string representing the file to write
+        - lengths: a sequence of integers representing the numbers of
+          error correction bytes to include
+    """
+    lines = ['"""',
+             "Pregenerated Reed-Solomon Generator Polynomials",
+             "",
+             "Written by gf256.write_generator_module; do not edit.  Maps",
+             "each number of error correction bytes k used by QR codes to the",
+             "k + 1 coefficients of the product of (x - 2^i) for i < k,",
+             "highest power first.",
+             '"""',
+             "",
+             "GENERATORS = {"]
+    for num_correction_bytes in lengths:
+        lines.append("    %d: bytes.fromhex(%r)," % (
+            num_correction_bytes, _build_generator(num_correction_bytes).hex()))
+    lines.append("}")
+    with open(filename, "w") as out:
+        out.write("\n".join(lines) + "\n")
+
+# For each number of error correction bytes, a list mapping every
+# feedback number c to c times the generator (without its leading 1),
+# packed into one integer; built on first use
+_feedback_rows = {}
+
+def _encoder_rows(num_correction_bytes):
+    """
+    Returns: the feedback rows used by rs_encode for num_correction_bytes.
+    """
+    rows = _feedback_rows.get(num_correction_bytes)
+    if rows is None:
+        tail = generator(num_correction_bytes)[1:]
+        rows = [int.from_bytes(scale_row(tail, feedback), "big")
+                for feedback in range(256)]
+        _feedback_rows[num_correction_bytes] = rows
+    return rows
+
+def rs_encode(data, num_correction_bytes):
+    """
+    Computes Reed-Solomon error correction bytes: the remainder of
+    dividing data * x^k by the generator polynomial.
+
+    The division runs as a shift register of k bytes, held in one
+    integer.  Each data byte costs one table lookup, one shift and one
+    XOR, whatever the value of k.
+
+    inputs:
+        - data: a bytes-like object (bytes, bytearray or memoryview)
+          holding the data bytes, highest power first
+        - num_correction_bytes: an integer representing the number of
+          error correction bytes (k)
+
+    Returns: a bytes object of the k error correction bytes, highest
+    power first.
+    """
+    if num_correction_bytes == 0:
+        return b""
+    rows = _encoder_rows(num_correction_bytes)
+    top = 8 * (num_correction_bytes - 1)
+    mask = (1 << (8 * num_correction_bytes)) - 1
+    register = 0
+    for byte in memoryview(data).cast("B"):
+        register = ((register << 8) & mask) ^ rows[byte ^ (register >> top)]
+    return register.to_bytes(num_correction_bytes, "big")
+
+def rs_encode_batch(blocks, num_correction_bytes):
+    """
+    Computes the Reed-Solomon error correction bytes of many data blocks
+    of the same length at once.
+
+    The blocks are encoded side by side: the shift register holds k rows
+    with one byte per block, and each data column is fed in with one
+    translation and one XOR per row over all the blocks, so the per-byte
+    cost is paid in C rather than in Python.
+
+    inputs:
+        - blocks: a sequence of bytes-like objects, all of the same
+          length, holding the data bytes of each block, highest power
+          first
+        - num_correction_bytes: an integer representing the number of
+          error correction bytes (k)
+
+    Returns: a list holding the bytes object of k error correction
+    bytes of each block, in the same order as blocks.
+    """
+    num_blocks = len(blocks)
+    if num_blocks == 0:
+        return []
+    if num_correction_bytes == 0:
+        return [b""] * num_blocks
+    length = len(blocks[0])
+    if any(len(block) != length for block in blocks):
+        raise ValueError("blocks must all have the same length")
+    joined = b"".join(blocks)
+    table = multiplication_table()
+    tails = [table[coeff] for coeff in generator(num_correction_bytes)[1:]]
+    # Entry i of the register holds the coefficient of x^(k-1-i) in
+    # every block, packed into one integer so that it is added to in a
+    # single XOR
+    register = [0] * num_correction_bytes
+    for column in range(length):
+        data = int.from_bytes(joined[column::length], "big")
+        feedback = (data ^ register.pop(0)).to_bytes(num_blocks, "big")
+        register.append(0)
+        register = [row ^ int.from_bytes(feedback.translate(tail), "big")
+                    for row, tail in zip(register, tails)]
+    rows = b"".join([row.to_bytes(num_blocks, "big") for row in register])
+    return [rows[block::num_blocks] for block in range(num_blocks)]
+
+try:
+    from rs_generators import GENERATORS as _PREGENERATED
+    _generators.update(_PREGENERATED)
+except ImportError:
+    pass
@@ -4,20 +4,32 @@ The Kevin Bacon Game.
 Replace "pass" with your code.
 """
 
+import hashlib
+import heapq
+import mmap
+import os
+import random
+import time
 import simpleplot
 import comp140_module4 as movies
-from collections import defaultdict
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import compress
+from collections.abc import Mapping, MutableMapping
 
 class Queue:
     """
-    A simple implementation of a FIFO queue.
+    A simple implementation of a FIFO queue, backed by a deque so that
+    every operation takes constant time.
     """
 
     def __init__(self):
         """
         Initialize the queue.
         """
-        self._queue = []
+        self._queue = deque()
 
     def __len__(self):
         """
@@ -54,15 +66,13 @@ class Queue:
 
         Returns: the least recently added item.
         """
-        return self._queue.pop(0)
+        return self._queue.popleft()
 
     def clear(self):
         """
         Remove all items from the queue.
         """
-        copy_queue = self._queue.copy()
-        for item in copy_queue:
-            self._queue.remove(item)
+        self._queue.clear()
 
 
 def bfs(graph, start_node):
@@ -97,7 +107,715 @@ def bfs(graph, start_node):
                 queue.push(nbr)
     return (dist, parent)
 
-def distance_histogram(graph, node):
+def targeted_bfs(graph, start_node, targets, max_depth=None):
+    """
+    Performs a breadth-first search on graph starting at the
+    start_node that stops as soon as every target has been reached,
+    or once max_depth levels have been searched.
+
+    inputs:
+        - graph: a graph object
+        - start_node: a node in graph representing the start node
+        - targets: a collection of nodes in graph to search for
+        - max_depth: an integer representing the greatest distance to
+          search, or None for no limit
+
+    Returns: a three-element tuple containing a dictionary associating
+    each visited node and target with its distance (infinity for
+    targets that were not reached), a dictionary associating each
+    visited node and target with its parent node (None for start_node
+    and targets that were not reached), which can be passed to
+    find_path, and a set of the targets that were not reached.
+    """
+    dist = {start_node: 0}
+    parent = {start_node: None}
+    remaining = set(targets)
+    remaining.discard(start_node)
+    queue = Queue()
+    queue.push(start_node)
+    while len(queue) > 0 and len(remaining) > 0:
+        node = queue.pop()
+        if max_depth is not None and dist[node] >= max_depth:
+            break
+        for nbr in graph.get_neighbors(node):
+            if nbr not in dist:
+                dist[nbr] = dist[node] + 1
+                parent[nbr] = node
+                queue.push(nbr)
+                remaining.discard(nbr)
+    for target in remaining:
+        dist[target] = float("inf")
+        parent[target] = None
+    return (dist, parent, remaining)
+
+def update_bfs(graph, dist, parent, new_edges):
+    """
+    Updates the result of bfs after edges have been added to graph,
+    visiting only the nodes whose distance decreases.
+
+    inputs:
+        - graph: a graph object that already contains new_edges
+        - dist: a dictionary associating each node with its distance,
+          as returned by bfs, which is updated in place
+        - parent: a dictionary associating each node with its parent
+          node, as returned by bfs, which is updated in place
+        - new_edges: a list of (actor1, actor2, movie) tuples
+
+    Returns: a set of the nodes whose distance decreased.
+    """
+    changed = set()
+    openheap = []
+    for actor1, actor2, _ in new_edges:
+        # New actors start out unreachable, as in bfs
+        for actor in (actor1, actor2):
+            if actor not in dist:
+                dist[actor] = float("inf")
+                parent[actor] = None
+        for node, nbr in ((actor1, actor2), (actor2, actor1)):
+            if dist[node] + 1 < dist[nbr]:
+                dist[nbr] = dist[node] + 1
+                parent[nbr] = node
+                heapq.heappush(openheap, (dist[nbr], nbr))
+
+    # Propagate the decreases outward in order of distance, so each
+    # node is expanded at most once, with its final distance
+    while len(openheap) > 0:
+        node_dist, node = heapq.heappop(openheap)
+        if node_dist > dist[node] or node in changed:
+            continue
+        changed.add(node)
+        for nbr in graph.get_neighbors(node):
+            if node_dist + 1 < dist.get(nbr, float("inf")):
+                dist[nbr] = node_dist + 1
+                parent[nbr] = node
+                heapq.heappush(openheap, (dist[nbr], nbr))
+    return changed
+
+def add_movie_edges(graph, new_edges, results=(), cache=None):
+    """
+    Adds new connections to graph and updates previously computed
+    bfs results to match.
+
+    inputs:
+        - graph: a graph object
+        - new_edges: a list of (actor1, actor2, movie) tuples, each
+          connecting two actors who appeared in the movie
+        - results: a collection of (dist, parent) tuples of dictionaries
+          returned by bfs on graph, which are updated in place
+        - cache: a BFSCache whose results for graph are updated too, or
+          None
+
+    Returns: a list with, for each result, the set of nodes whose
+    distance decreased.  Raises TypeError, before graph is changed, if
+    a result cannot be updated in place (such as the read-only results
+    of a BFSCache, which should be passed as cache instead).
+    """
+    results = list(results)
+    for dist, parent in results:
+        if not isinstance(dist, MutableMapping) or not isinstance(parent, MutableMapping):
+            raise TypeError("results must be dictionaries returned by bfs; "
+                            "pass a BFSCache as cache instead")
+    for actor1, actor2, movie in new_edges:
+        for actor in (actor1, actor2):
+            try:
+                graph.get_neighbors(actor)
+            except KeyError:
+                graph.add_node(actor)
+        graph.add_edge(actor1, actor2, movie)
+    if cache is not None:
+        cache.update(graph, new_edges)
+    return [update_bfs(graph, dist, parent, new_edges) for dist, parent in results]
+
+class CompactGraph:
+    """
+    A compact, read-only copy of a movie graph.
+
+    Actors are interned as the integers 0 to n-1, in sorted name order,
+    and the neighbors of actor i are targets[offsets[i]:offsets[i + 1]],
+    in increasing order.  The movies connecting two actors live in a
+    side table: edge_movies holds, for each entry of targets, an index
+    into a list of distinct movie sets.
+    """
+
+    def __init__(self, graph):
+        """
+        Convert graph into compact form.
+
+        input:
+            - graph: a graph object
+        """
+        self._build(graph.nodes(), graph.get_neighbors, graph.get_attrs)
+
+    @classmethod
+    def from_casts(cls, casts):
+        """
+        Builds a CompactGraph directly from movie casts, connecting every
+        two actors that appear in the same movie.
+
+        input:
+            - casts: a dictionary mapping each movie to a collection of
+              the actors in it
+
+        Returns: a CompactGraph of the resulting graph.
+        """
+        # Every actor gets an entry, even one who is alone in a movie
+        movie_sets = {}
+        for movie, cast in casts.items():
+            cast = set(cast)
+            for actor in cast:
+                costar_movies = movie_sets.setdefault(actor, defaultdict(set))
+                for costar in cast:
+                    if costar != actor:
+                        costar_movies[costar].add(movie)
+        cgraph = cls.__new__(cls)
+        cgraph._build(movie_sets.keys(), movie_sets.__getitem__,
+                      lambda actor, costar: movie_sets[actor][costar])
+        return cgraph
+
+    def _build(self, names, get_neighbors, get_attrs):
+        """
+        Fill in the compact form of a graph.
+
+        inputs:
+            - names: a collection of the actors in the graph
+            - get_neighbors: a function which takes an actor and returns
+              the actors connected to them
+            - get_attrs: a function which takes two connected actors and
+              returns the set of movies connecting them
+        """
+        self._names = sorted(names)
+        self._index = {}
+        for idx, name in enumerate(self._names):
+            self._index[name] = idx
+
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        self.edge_movies = array("i")
+        self._movie_sets = []
+        movie_set_ids = {}
+        for name in self._names:
+            nbrs = sorted(self._index[nbr] for nbr in get_neighbors(name))
+            for nbr in nbrs:
+                movie_set = frozenset(get_attrs(name, self._names[nbr]))
+                if movie_set not in movie_set_ids:
+                    movie_set_ids[movie_set] = len(self._movie_sets)
+                    self._movie_sets.append(movie_set)
+                self.targets.append(nbr)
+                self.edge_movies.append(movie_set_ids[movie_set])
+            self.offsets.append(len(self.targets))
+
+    def __len__(self):
+        """
+        Returns: an integer representing the number of actors.
+        """
+        return len(self._names)
+
+    def get_index(self, name):
+        """
+        Returns: the integer id of the actor with the given name.
+        """
+        return self._index[name]
+
+    def get_name(self, idx):
+        """
+        Returns: the name of the actor with the integer id idx.
+        """
+        return self._names[idx]
+
+    def get_neighbors(self, idx):
+        """
+        Returns: an array of the ids of the neighbors of actor idx.
+        """
+        return self.targets[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def get_movies(self, idx1, idx2):
+        """
+        Returns: the set of movies connecting actors idx1 and idx2,
+        which is empty if they are not connected.
+        """
+        lo = self.offsets[idx1]
+        hi = self.offsets[idx1 + 1]
+        edge = bisect_left(self.targets, idx2, lo, hi)
+        if edge < hi and self.targets[edge] == idx2:
+            return set(self._movie_sets[self.edge_movies[edge]])
+        return set()
+
+    def fingerprint(self):
+        """
+        Returns: a string that identifies the actors and connections of
+        this graph; graphs with different actors or connections have
+        different fingerprints.
+        """
+        digest = hashlib.sha1()
+        digest.update("\n".join(self._names).encode("utf-8"))
+        digest.update(self.offsets.tobytes())
+        digest.update(self.targets.tobytes())
+        return digest.hexdigest()
+
+    def to_dicts(self, dist, parent):
+        """
+        Converts the arrays returned by compact_bfs into the form
+        returned by bfs.
+
+        inputs:
+            - dist: an array of distances (-1 if unreachable)
+            - parent: an array of parent ids (-1 if none)
+
+        Returns: a two-element tuple containing a dictionary
+        associating each actor with its distance (infinity if
+        unreachable) and a dictionary associating each actor with its
+        parent (or None).
+        """
+        dist_dict = {}
+        parent_dict = {}
+        for idx, name in enumerate(self._names):
+            if dist[idx] < 0:
+                dist_dict[name] = float("inf")
+            else:
+                dist_dict[name] = dist[idx]
+            if parent[idx] < 0:
+                parent_dict[name] = None
+            else:
+                parent_dict[name] = self._names[parent[idx]]
+        return (dist_dict, parent_dict)
+
+def load_compact_graph(graph_name):
+    """
+    Loads a movie graph and converts it into compact form.
+
+    input:
+        - graph_name: a string representing the name of the graph to load,
+          as accepted by movies.load_graph
+
+    Returns: a CompactGraph of the loaded graph.
+    """
+    return CompactGraph(movies.load_graph(graph_name))
+
+def compact_bfs(cgraph, start_node):
+    """
+    Performs a breadth-first search on a CompactGraph starting at the
+    start_node.
+
+    inputs:
+        - cgraph: a CompactGraph
+        - start_node: the integer id of the start node
+
+    Returns: a two-element tuple containing an array associating each
+    actor id with its distance from start_node (-1 if unreachable) and
+    an array associating each actor id with its parent id (-1 if none).
+    """
+    offsets = cgraph.offsets
+    targets = cgraph.targets
+    dist = array("i", [-1]) * len(cgraph)
+    parent = array("i", [-1]) * len(cgraph)
+    dist[start_node] = 0
+    # Expand one whole level at a time, so every node in next_frontier
+    # is at distance level
+    frontier = [start_node]
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        next_frontier = []
+        for node in frontier:
+            for nbr in targets[offsets[node]:offsets[node + 1]]:
+                if dist[nbr] < 0:
+                    dist[nbr] = level
+                    parent[nbr] = node
+                    next_frontier.append(nbr)
+        frontier = next_frontier
+    return (dist, parent)
+
+def update_compact_bfs(cgraph, dist, parent, new_edges):
+    """
+    Updates the result of compact_bfs after edges have been added,
+    visiting only the actors whose distance decreases.
+
+    inputs:
+        - cgraph: a CompactGraph that already contains new_edges
+        - dist: an array of distances (-1 if unreachable), as returned
+          by compact_bfs, which is updated in place
+        - parent: an array of parent ids (-1 if none), as returned by
+          compact_bfs, which is updated in place
+        - new_edges: a list of (id1, id2) tuples of connected actors
+
+    Returns: a set of the ids of the actors whose distance decreased.
+    """
+    changed = set()
+    openheap = []
+    for idx1, idx2 in new_edges:
+        for node, nbr in ((idx1, idx2), (idx2, idx1)):
+            if dist[node] >= 0 and (dist[nbr] < 0 or dist[node] + 1 < dist[nbr]):
+                dist[nbr] = dist[node] + 1
+                parent[nbr] = node
+                heapq.heappush(openheap, (dist[nbr], nbr))
+
+    # Propagate the decreases outward in order of distance, as update_bfs
+    while len(openheap) > 0:
+        node_dist, node = heapq.heappop(openheap)
+        if node_dist > dist[node] or node in changed:
+            continue
+        changed.add(node)
+        for nbr in cgraph.get_neighbors(node):
+            if dist[nbr] < 0 or node_dist + 1 < dist[nbr]:
+                dist[nbr] = node_dist + 1
+                parent[nbr] = node
+                heapq.heappush(openheap, (dist[nbr], nbr))
+    return changed
+
+def direction_optimizing_bfs(cgraph, start_node, alpha=14, beta=24):
+    """
+    Performs a level-synchronous breadth-first search on a CompactGraph
+    that switches between two ways of building each level.  Top-down
+    steps scan the edges of the frontier for unvisited actors.
+    Bottom-up steps scan the unvisited actors for an edge into the
+    frontier, stopping at the first one found, which checks far fewer
+    edges once the frontier covers much of a small-world graph.
+
+    The frontier and visited set are held as byte flags.  Bottom-up
+    steps find the unvisited actors and each one's first frontier
+    neighbor with itertools.compress over those flags, rather than
+    with a Python-level test per actor or edge.
+
+    inputs:
+        - cgraph: a CompactGraph
+        - start_node: the integer id of the start node
+        - alpha: switch to bottom-up once the frontier has more than
+          1/alpha of the edges of the unvisited actors
+        - beta: switch back to top-down once the frontier holds fewer
+          than 1/beta of all actors
+
+    Returns: a two-element tuple containing an array associating each
+    actor id with its distance from start_node (-1 if unreachable) and
+    an array associating each actor id with its parent id (-1 if none).
+    The distances are the same as those of compact_bfs; actors with
+    several possible parents may be given a different one.
+    """
+    offsets = cgraph.offsets
+    targets = cgraph.targets
+    num_nodes = len(cgraph)
+    dist = array("i", [-1]) * num_nodes
+    parent = array("i", [-1]) * num_nodes
+    unvisited = bytearray(b"\x01") * num_nodes
+
+    dist[start_node] = 0
+    unvisited[start_node] = 0
+    unvisited_edges = len(targets) - (offsets[start_node + 1] - offsets[start_node])
+    frontier = [start_node]
+    level = 0
+    bottom_up = False
+    while len(frontier) > 0:
+        level += 1
+        if bottom_up:
+            if len(frontier) < num_nodes / beta:
+                bottom_up = False
+        else:
+            frontier_edges = 0
+            for node in frontier:
+                frontier_edges += offsets[node + 1] - offsets[node]
+            if frontier_edges > unvisited_edges / alpha:
+                bottom_up = True
+
+        next_frontier = []
+        if bottom_up:
+            in_frontier = bytearray(num_nodes)
+            for node in frontier:
+                in_frontier[node] = 1
+            is_frontier = in_frontier.__getitem__
+            for node in list(compress(range(num_nodes), unvisited)):
+                nbrs = targets[offsets[node]:offsets[node + 1]]
+                found = next(compress(nbrs, map(is_frontier, nbrs)), -1)
+                if found >= 0:
+                    dist[node] = level
+                    parent[node] = found
+                    unvisited[node] = 0
+                    next_frontier.append(node)
+        else:
+            for node in frontier:
+                for nbr in targets[offsets[node]:offsets[node + 1]]:
+                    if unvisited[nbr]:
+                        dist[nbr] = level
+                        parent[nbr] = node
+                        unvisited[nbr] = 0
+                        next_frontier.append(nbr)
+
+        for node in next_frontier:
+            unvisited_edges -= offsets[node + 1] - offsets[node]
+        frontier = next_frontier
+    return (dist, parent)
+
+def benchmark_bfs(graph_name='subgraph5000', synthetic_actors=200000,
+                  synthetic_movies=150000, num_starts=5, seed=None):
+    """
+    Times bfs, compact_bfs and direction_optimizing_bfs on a loaded
+    movie graph and on a larger synthetic one, checks that their
+    distances agree and prints the results.
+
+    inputs:
+        - graph_name: a string representing the name of the graph to load
+        - synthetic_actors: an integer representing the number of actors
+          in the synthetic graph
+        - synthetic_movies: an integer representing the number of movies
+          in the synthetic graph, each with a random cast of 2 to 8
+        - num_starts: an integer representing the number of start actors
+          to time on each graph
+        - seed: a seed for building the synthetic graph and choosing
+          start actors
+
+    returns: a dictionary mapping (graph, search) pairs to the average
+    time of one search in seconds.
+    """
+    rng = random.Random(seed)
+    graph = movies.load_graph(graph_name)
+    casts = {}
+    for movie in range(synthetic_movies):
+        casts["Movie %d" % movie] = rng.sample(range(synthetic_actors),
+                                               rng.randint(2, 8))
+    graphs = [(graph_name, graph, CompactGraph(graph)),
+              ("synthetic", None, CompactGraph.from_casts(casts))]
+
+    times = {}
+    for name, graph, cgraph in graphs:
+        starts = [rng.randrange(len(cgraph)) for _ in range(num_starts)]
+        searches = [("compact_bfs", compact_bfs),
+                    ("direction_optimizing_bfs", direction_optimizing_bfs)]
+        if graph is not None:
+            searches.insert(0, ("bfs", None))
+        for search_name, search in searches:
+            before = time.perf_counter()
+            for start in starts:
+                if search is None:
+                    bfs(graph, cgraph.get_name(start))
+                else:
+                    search(cgraph, start)
+            times[(name, search_name)] = (time.perf_counter() - before) / num_starts
+            print("%-14s %-26s %8.2f ms" % (name, search_name,
+                                            times[(name, search_name)] * 1000))
+        for start in starts:
+            if compact_bfs(cgraph, start)[0] != direction_optimizing_bfs(cgraph, start)[0]:
+                print("Distances differ from actor %d on %s" % (start, name))
+    return times
+
+class _ArrayMap(Mapping):
+    """
+    A read-only dictionary view of a distance or parent array, keyed by
+    actor name, that looks like the dictionaries returned by bfs.
+    """
+
+    def __init__(self, cgraph, values, is_parent):
+        """
+        Create a view of values.
+
+        inputs:
+            - cgraph: the CompactGraph the values are indexed by
+            - values: an array or memoryview of distances or parent ids
+            - is_parent: True if values holds parent ids
+        """
+        self._cgraph = cgraph
+        self._values = values
+        self._is_parent = is_parent
+
+    def __getitem__(self, name):
+        """
+        Returns: the distance (infinity if unreachable) or parent (None
+        if none) of the actor with the given name.
+        """
+        value = self._values[self._cgraph.get_index(name)]
+        if value < 0:
+            if self._is_parent:
+                return None
+            return float("inf")
+        if self._is_parent:
+            return self._cgraph.get_name(value)
+        return value
+
+    def __iter__(self):
+        """
+        Returns: an iterator over the actor names.
+        """
+        for idx in range(len(self._cgraph)):
+            yield self._cgraph.get_name(idx)
+
+    def __len__(self):
+        """
+        Returns: an integer representing the number of actors.
+        """
+        return len(self._cgraph)
+
+class BFSCache:
+    """
+    A cache of breadth-first search results keyed by start actor.
+
+    The most recently used results are kept in memory.  If a directory
+    is given, every result is also written there as raw distance and
+    parent arrays, which later lookups memory-map instead of searching
+    again.  Results are also keyed by a fingerprint of the graph, so a
+    graph with different actors or connections never reads another
+    graph's results.
+
+    The compact copy of a graph is only rebuilt when a different graph
+    object is passed in, so a graph changed in place must be reported
+    with update (add_movie_edges does this when given the cache).
+    """
+
+    def __init__(self, max_entries=16, directory=None):
+        """
+        Create an empty cache.
+
+        inputs:
+            - max_entries: an integer representing the number of results
+              to keep in memory
+            - directory: a string naming the directory for the on-disk
+              tier, or None to keep results only in memory
+        """
+        self._max_entries = max_entries
+        self._directory = directory
+        self._entries = OrderedDict()
+        self._graph = None
+        self._cgraph = None
+        self._fingerprint = None
+
+    def __len__(self):
+        """
+        Returns: an integer representing the number of results held in
+        memory.
+        """
+        return len(self._entries)
+
+    def invalidate(self):
+        """
+        Forget the compact copy of the current graph.  Call this after
+        changing a graph in place, so that its new fingerprint is
+        computed on the next lookup.
+        """
+        self._graph = None
+        self._cgraph = None
+        self._fingerprint = None
+
+    def update(self, graph, new_edges):
+        """
+        Brings the cached results for graph up to date after edges have
+        been added to it in place.  Each result held in memory is
+        extended to any new actors, updated with update_compact_bfs and
+        stored again under the graph's new fingerprint.  Results handed
+        out before the update are not changed.
+
+        inputs:
+            - graph: a graph object that already contains new_edges
+            - new_edges: a list of (actor1, actor2, movie) tuples
+        """
+        old_cgraph = None
+        if graph is self._graph:
+            old_cgraph = self._cgraph
+        old_fingerprint = self._fingerprint
+        self.invalidate()
+        cgraph = self.get_compact_graph(graph)
+        if old_cgraph is None:
+            return
+        # The new id of every old actor; new actors shift the sorted ids
+        new_ids = array("i", [cgraph.get_index(old_cgraph.get_name(idx))
+                              for idx in range(len(old_cgraph))])
+        edge_ids = [(cgraph.get_index(actor1), cgraph.get_index(actor2))
+                    for actor1, actor2, _ in new_edges]
+        entries = OrderedDict()
+        for key, (dist, parent) in self._entries.items():
+            if key[0] != old_fingerprint:
+                entries[key] = (dist, parent)
+                continue
+            new_dist = array("i", [-1]) * len(cgraph)
+            new_parent = array("i", [-1]) * len(cgraph)
+            for old_idx, new_idx in enumerate(new_ids):
+                new_dist[new_idx] = dist[old_idx]
+                if parent[old_idx] >= 0:
+                    new_parent[new_idx] = new_ids[parent[old_idx]]
+            update_compact_bfs(cgraph, new_dist, new_parent, edge_ids)
+            new_key = (self._fingerprint, key[1])
+            self._store(new_key, new_dist, new_parent)
+            entries[new_key] = (new_dist, new_parent)
+        self._entries = entries
+
+    def get_compact_graph(self, graph):
+        """
+        Returns: a CompactGraph of graph, which is only rebuilt when a
+        different graph object is passed in.
+        """
+        if graph is not self._graph:
+            self._cgraph = CompactGraph(graph)
+            self._fingerprint = self._cgraph.fingerprint()
+            self._graph = graph
+        return self._cgraph
+
+    def bfs(self, graph, start_node):
+        """
+        Performs a breadth-first search on graph starting at the
+        start_node, unless its result is already cached.
+
+        inputs:
+            - graph: a graph object
+            - start_node: a node in graph representing the start node
+
+        Returns: a two-element tuple containing a dictionary
+        associating each node with its distance from start_node and a
+        dictionary associating each node with its parent node, exactly
+        like bfs.
+        """
+        cgraph = self.get_compact_graph(graph)
+        key = (self._fingerprint, start_node)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            dist, parent = self._entries[key]
+        else:
+            dist, parent = self._load(key, len(cgraph))
+            if dist is None:
+                dist, parent = compact_bfs(cgraph, cgraph.get_index(start_node))
+                self._store(key, dist, parent)
+            self._entries[key] = (dist, parent)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return (_ArrayMap(cgraph, dist, False), _ArrayMap(cgraph, parent, True))
+
+    def _path(self, key):
+        """
+        Returns: the name of the file holding the result for key.
+        """
+        start_hash = hashlib.sha1(repr(key[1]).encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, key[0], start_hash + ".bfs")
+
+    def _load(self, key, num_nodes):
+        """
+        Returns: a two-element tuple containing memoryviews of the
+        distance and parent arrays for key, memory-mapped from the
+        on-disk tier, or (None, None) if they are not there.
+        """
+        if self._directory is None or num_nodes == 0:
+            return (None, None)
+        try:
+            with open(self._path(key), "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return (None, None)
+        # A file of the wrong size (e.g. truncated) is searched again
+        if len(mapped) != 2 * num_nodes * array("i").itemsize:
+            mapped.close()
+            return (None, None)
+        values = memoryview(mapped).cast("i")
+        return (values[:num_nodes], values[num_nodes:])
+
+    def _store(self, key, dist, parent):
+        """
+        Write the distance and parent arrays for key to the on-disk tier.
+        """
+        if self._directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a
+        # partially written result
+        with open(path + ".tmp", "wb") as file:
+            dist.tofile(file)
+            parent.tofile(file)
+        os.replace(path + ".tmp", path)
+
+def distance_histogram(graph, node, cache=None):
     """
     Computes the distance between the given node and all other
     nodes in that graph and creates a histogram of those distances.
@@ -105,23 +823,156 @@ def distance_histogram(graph, node):
     inputs:
         - graph: a graph object
         - node: a node in graph
+        - cache: a BFSCache to read the search result through, or None
 
     returns: a dictionary mapping each distance with the number of
     nodes that are that distance from node.
     """
     dis_his = defaultdict(int)
-#create a list version of the bfs's function's output so it is iterable
-    bfs_output = list(bfs(graph, node))
-    for dictionary in bfs_output:
-#checking: if 0 is a value in one of two dictionaries in the output of
-#the bfs function -> that is the dist dictionary
-        if 0 in dictionary.values():
+    if cache is not None:
+        dist = cache.bfs(graph, node)[0]
+    else:
+        dist = bfs(graph, node)[0]
 #iterate through the values of the dist dictionary, with each value
 #being the key of the dis_his dictionary
-            for value in dictionary.values():
-                dis_his[value] += 1
+    for value in dist.values():
+        dis_his[value] += 1
     return dis_his
     
+# Per-process state for distance_statistics workers, set once by
+# _init_statistics_worker so the graph is not sent with every chunk
+_statistics_worker = {}
+
+def _init_statistics_worker(cgraph):
+    """
+    Stores the CompactGraph searched by a distance_statistics worker
+    process.
+    """
+    _statistics_worker["cgraph"] = cgraph
+
+def _source_statistics(sources):
+    """
+    Runs one breadth-first search per source in the current
+    distance_statistics worker.
+
+    input:
+        - sources: a list of actor ids
+
+    Returns: a three-element tuple containing a Counter of all
+    distances (-1 for unreachable), a Counter of the eccentricities of
+    the sources and a dictionary associating each source that reaches
+    another actor with its average distance to the actors it reaches.
+    """
+    cgraph = _statistics_worker["cgraph"]
+    histogram = Counter()
+    eccentricities = Counter()
+    averages = {}
+    for source in sources:
+        counts = Counter(compact_bfs(cgraph, source)[0])
+        histogram.update(counts)
+        reached = len(cgraph) - counts[-1]
+        eccentricities[max(counts)] += 1
+        if reached > 1:
+            total = 0
+            for distance, count in counts.items():
+                if distance > 0:
+                    total += distance * count
+            averages[source] = total / (reached - 1)
+    return (histogram, eccentricities, averages)
+
+def distance_statistics(graph, sample_fraction=1, num_workers=None,
+                        chunk_size=64, seed=None):
+    """
+    Computes distance statistics over the whole graph by running one
+    breadth-first search from every actor, or from a random sample of
+    actors for an approximate answer.  The searches are split into
+    chunks across a pool of worker processes, each of which receives
+    the graph only once, and the results are merged as chunks finish.
+
+    inputs:
+        - graph: a graph object or a CompactGraph
+        - sample_fraction: a number between 0 and 1 representing the
+          fraction of actors to search from
+        - num_workers: an integer representing the number of worker
+          processes, None to use one per CPU, or 1 to compute everything
+          in this process
+        - chunk_size: an integer representing the number of searches per
+          task
+        - seed: a seed for choosing the sample
+
+    returns: a dictionary with the keys
+        - "histogram": a dictionary mapping each distance to the number
+          of (source, actor) pairs that are that far apart, with
+          unreachable pairs counted under infinity, like
+          distance_histogram
+        - "eccentricity_histogram": a dictionary mapping each
+          eccentricity (greatest distance to a reachable actor) to the
+          number of sources with it
+        - "diameter": the greatest eccentricity found, which is a lower
+          bound on the true diameter when sampling
+        - "average_distance": the average distance over all connected
+          pairs of distinct actors
+        - "average_bacon_numbers": a dictionary associating each source
+          with its average distance to the actors it reaches
+        - "num_sources": the number of sources searched from
+    """
+    if isinstance(graph, CompactGraph):
+        cgraph = graph
+    else:
+        cgraph = CompactGraph(graph)
+    sources = list(range(len(cgraph)))
+    if sample_fraction < 1:
+        rng = random.Random(seed)
+        sources = rng.sample(sources, max(1, int(len(sources) * sample_fraction)))
+    chunks = [sources[idx:idx + chunk_size]
+              for idx in range(0, len(sources), chunk_size)]
+
+    histogram = Counter()
+    eccentricities = Counter()
+    averages = {}
+    def merge(result):
+        """
+        Adds the result of one chunk to the running totals.
+        """
+        histogram.update(result[0])
+        eccentricities.update(result[1])
+        for source, average in result[2].items():
+            averages[cgraph.get_name(source)] = average
+
+    if num_workers == 1:
+        _init_statistics_worker(cgraph)
+        for chunk in chunks:
+            merge(_source_statistics(chunk))
+        _statistics_worker.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_statistics_worker,
+                                 initargs=(cgraph,)) as pool:
+            futures = [pool.submit(_source_statistics, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                merge(future.result())
+
+    dis_his = defaultdict(int)
+    total = 0
+    pairs = 0
+    for distance, count in histogram.items():
+        if distance < 0:
+            dis_his[float("inf")] += count
+        else:
+            dis_his[distance] += count
+            if distance > 0:
+                total += distance * count
+                pairs += count
+    average_distance = float("nan")
+    if pairs > 0:
+        average_distance = total / pairs
+    return {"histogram": dis_his,
+            "eccentricity_histogram": dict(eccentricities),
+            "diameter": max(eccentricities, default=0),
+            "average_distance": average_distance,
+            "average_bacon_numbers": averages,
+            "num_sources": len(sources)}
+
 def find_path(graph, start_person, end_person, parents):
     """
     Computes the path from start_person to end_person in the graph.
@@ -143,13 +994,137 @@ def find_path(graph, start_person, end_person, parents):
         current_parent = parents[current_node]
         if parents[current_node] == None:
             return []
-#prepend to the path the step
-        path.insert(0, (current_parent, graph.get_attrs(current_node, current_parent)))
+#collect the steps backwards and reverse them at the end, since
+#inserting at the front of a list is slow
+        path.append((current_parent, graph.get_attrs(current_node, current_parent)))
         current_node = current_parent
+    path.reverse()
+    path.append((end_person, set()))
+    return path
+
+def find_paths(graph, start_person, end_people, parents, index=None):
+    """
+    Computes the paths from start_person to each of end_people in the
+    same search tree.  The step leading to each person, with the
+    movies of that connection, is looked up only once and shared by the
+    paths of everyone reached through them; each path then takes time
+    proportional to its length.
+
+    inputs:
+        - graph: a graph oject with edges representing the connections between people
+        - start_person: a node in graph representing the starting node
+        - end_people: a list of nodes in graph representing the ending nodes
+        - parents: a dictionary representing the parents in the graph
+        - index: a CompactGraph of graph to read the movies from instead
+          of the graph, or None
+
+    returns a dictionary mapping each of end_people to their path in
+    the form returned by find_path.
+    """
+    # The step leading to each person whose path is known: their parent
+    # and the movies connecting them (None for start_person)
+    steps = {start_person: None}
+    paths = {}
+    for end_person in end_people:
+        # Walk up the tree until reaching someone whose path is known
+        chain = []
+        current_node = end_person
+        while current_node not in steps:
+            current_parent = parents.get(current_node)
+            if current_parent is None:
+                break
+            chain.append(current_node)
+            current_node = current_parent
+        if current_node not in steps:
+            paths[end_person] = []
+            continue
+        # Record the new steps back down the chain
+        for node in reversed(chain):
+            if index is not None:
+                movie_set = index.get_movies(index.get_index(current_node),
+                                             index.get_index(node))
+            else:
+                movie_set = graph.get_attrs(node, current_node)
+            steps[node] = (current_node, movie_set)
+            current_node = node
+        # Follow the steps back to start_person and reverse them
+        path = [(end_person, set())]
+        current_node = end_person
+        while steps[current_node] is not None:
+            current_parent, movie_set = steps[current_node]
+            path.append((current_parent, movie_set))
+            current_node = current_parent
+        path.reverse()
+        paths[end_person] = path
+    return paths
+
+def bidirectional_path(graph, start_person, end_person):
+    """
+    Computes a shortest path from start_person to end_person with a
+    bidirectional breadth-first search.  The searches from both ends
+    advance one level at a time, always expanding the smaller
+    frontier, and stop at the level in which they meet.
+
+    inputs:
+        - graph: a graph oject with edges representing the connections between people
+        - start_person: a node in graph representing the starting node
+        - end_person: a node in graph representing the ending node
+
+    returns a list of tuples of the path in the same form as find_path:
+        [(actor1, {movie1a, ...}), (actor2, {movie2a, ...}), ...]
+    or an empty list if there is no path.
+    """
+    if start_person == end_person:
+        return [(end_person, set())]
+    # Per side: the parent and distance of each visited node
+    parents = ({start_person: None}, {end_person: None})
+    dists = ({start_person: 0}, {end_person: 0})
+    frontiers = [[start_person], [end_person]]
+    meet_person = None
+
+    while meet_person is None and len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+        if len(frontiers[0]) <= len(frontiers[1]):
+            side = 0
+        else:
+            side = 1
+        parent = parents[side]
+        dist = dists[side]
+        other_dist = dists[1 - side]
+        next_frontier = []
+        best_length = float("inf")
+        # Finish the whole level, keeping the shortest connection found
+        for node in frontiers[side]:
+            for nbr in graph.get_neighbors(node):
+                if nbr not in parent:
+                    parent[nbr] = node
+                    dist[nbr] = dist[node] + 1
+                    next_frontier.append(nbr)
+                    if nbr in other_dist and dist[nbr] + other_dist[nbr] < best_length:
+                        best_length = dist[nbr] + other_dist[nbr]
+                        meet_person = nbr
+        frontiers[side] = next_frontier
+
+    if meet_person is None:
+        return []
+    people = []
+    node = meet_person
+    while node is not None:
+        people.append(node)
+        node = parents[0][node]
+    people.reverse()
+    node = parents[1][meet_person]
+    while node is not None:
+        people.append(node)
+        node = parents[1][node]
+
+    path = []
+    for idx in range(len(people) - 1):
+        path.append((people[idx], graph.get_attrs(people[idx], people[idx + 1])))
     path.append((end_person, set()))
     return path
 
-def play_kevin_bacon_game(graph, start_person, end_people):
+def play_kevin_bacon_game(graph, start_person, end_people, bidirectional=False,
+                          cache=None):
     """
     Play the "Kevin Bacon Game" on the actors in the given
     graph.
@@ -158,18 +1133,27 @@ def play_kevin_bacon_game(graph, start_person, end_people):
         - graph: a a graph oject with edges representing the connections between people
         - start_person: a node in graph representing the node from which the search will start
         - end_people: a list of nodes in graph to which the search will be performed
+        - bidirectional: True to answer each of end_people with its own
+          bidirectional search instead of one search of the whole graph,
+          which is faster when there are only a few of them
+        - cache: a BFSCache to read the search result through, or None
 
     Prints the results out.
     """
-    bfs_output = list(bfs(graph, start_person))
-    for dictionary in bfs_output:
-#checking: if 0 is a value in one of two dictionaries in the output of
-#the bfs function -> that is the dist dictionary
-        if 0 not in dictionary.values():
-            parents = dictionary
+    if bidirectional:
+        for end_person in end_people:
+            movies.print_path(bidirectional_path(graph, start_person, end_person))
+        return
+    index = None
+    if cache is not None:
+        parents = cache.bfs(graph, start_person)[1]
+        # The cache already holds a compact copy to look up movies in
+        index = cache.get_compact_graph(graph)
+    else:
+        parents = targeted_bfs(graph, start_person, end_people)[1]
+    paths = find_paths(graph, start_person, end_people, parents, index)
     for end_person in end_people:
-        path = find_path(graph, start_person, end_person, parents)
-        movies.print_path(path)
+        movies.print_path(paths[end_person])
         
 
 def run():
@@ -177,6 +1161,7 @@ def run():
     Load a graph and play the Kevin Bacon Game.
     """
     graph5000 = movies.load_graph('subgraph5000')
+    cache = BFSCache()
 
     if len(graph5000.nodes()) > 0:
         # You can/should use smaller graphs and other actors while
@@ -185,11 +1170,11 @@ def run():
             ['Amy Adams', 'Andrew Garfield', 'Anne Hathaway', 'Barack Obama', \
              'Benedict Cumberbatch', 'Chris Pine', 'Daniel Radcliffe', \
              'Jennifer Aniston', 'Joseph Gordon-Levitt', 'Morgan Freeman', \
-             'Sandra Bullock', 'Tina Fey'])
+             'Sandra Bullock', 'Tina Fey'], cache=cache)
 
         # Plot distance histograms
         for person in ['Kevin Bacon', 'Stephanie Fratus']:
-            hist = distance_histogram(graph5000, person)
+            hist = distance_histogram(graph5000, person, cache)
             simpleplot.plot_bars(person, 400, 300, 'Distance', \
                 'Frequency', [hist], ["distance frequency"])
 
@@ -2,17 +2,27 @@
 Map Search
 """
 
+import heapq
+import json
+import math
+import pickle
+import random
+import time
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 import comp140_module7 as maps
 
 class Queue:
     """
-    A simple implementation of a FIFO queue.
+    A simple implementation of a FIFO queue, backed by a deque so that
+    every operation takes constant time.
     """
     def __init__(self):
         """
         Initialize the queue.
         """
-        self._items = []
+        self._items = deque()
         
     def __len__(self):
         """
@@ -26,7 +36,7 @@ class Queue:
         Returns: a string representation of the current state of the
         queue.
         """
-        return "Current state: " + str(self._items)
+        return "Current state: " + str(list(self._items))
         
     def push(self, item):
         """
@@ -45,13 +55,13 @@ class Queue:
 
         Returns: the least recently added item.
         """
-        return self._items.pop(0)
+        return self._items.popleft()
 
     def clear(self):
         """
         Remove all items from the queue.
         """
-        self._items = []
+        self._items.clear()
 
 class Stack:
     """
@@ -103,7 +113,108 @@ class Stack:
         self._items = []
 
 
-def bfs_dfs(graph, rac_class, start_node, end_node):
+class SearchStats:
+    """
+    Records what a search spent its time on: node expansions, pushes
+    onto the frontier, the peak frontier size, heuristic and
+    edge_distance calls and the wall-clock time of each phase.
+
+    Pass an instance as the stats argument of bfs_dfs, dfs,
+    iterative_dfs or astar.  Searches run without one do no extra work.
+    """
+    def __init__(self):
+        """
+        Initialize all counters to zero.
+        """
+        self.expansions = 0
+        self.pushes = 0
+        self.peak_frontier = 0
+        self.heuristic_calls = 0
+        self.edge_distance_calls = 0
+        self.phase_times = defaultdict(float)
+        self._phase = None
+        self._phase_start = 0.0
+
+    def __str__(self):
+        """
+        Returns: a string representation of the recorded statistics.
+        """
+        return "SearchStats: " + str(self.as_dict())
+
+    def start_phase(self, name):
+        """
+        End the current phase, if any, and start timing a new one.
+
+        input:
+            - name: a string naming the phase
+        """
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phase_times[self._phase] += now - self._phase_start
+        self._phase = name
+        self._phase_start = now
+
+    def stop(self):
+        """
+        End the current phase, if any.
+        """
+        if self._phase is not None:
+            self.phase_times[self._phase] += time.perf_counter() - self._phase_start
+            self._phase = None
+
+    def push(self, frontier_size):
+        """
+        Record one push onto a frontier that now holds frontier_size
+        items.
+        """
+        self.pushes += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+
+    def count_edge_distance(self, edge_distance):
+        """
+        Returns: a function that behaves like edge_distance but counts
+        its calls.
+        """
+        def counted(node1, node2, graph):
+            """
+            Counts the call and returns edge_distance(node1, node2, graph).
+            """
+            self.edge_distance_calls += 1
+            return edge_distance(node1, node2, graph)
+        return counted
+
+    def count_heuristic(self, heuristic):
+        """
+        Returns: a function that behaves like heuristic but counts its
+        calls.
+        """
+        def counted(node1, node2, graph):
+            """
+            Counts the call and returns heuristic(node1, node2, graph).
+            """
+            self.heuristic_calls += 1
+            return heuristic(node1, node2, graph)
+        return counted
+
+    def as_dict(self):
+        """
+        Returns: a dictionary of all recorded statistics.
+        """
+        return {"expansions": self.expansions,
+                "pushes": self.pushes,
+                "peak_frontier": self.peak_frontier,
+                "heuristic_calls": self.heuristic_calls,
+                "edge_distance_calls": self.edge_distance_calls,
+                "phase_times": dict(self.phase_times)}
+
+    def to_json(self):
+        """
+        Returns: the recorded statistics as a JSON string.
+        """
+        return json.dumps(self.as_dict())
+
+def bfs_dfs(graph, rac_class, start_node, end_node, stats=None):
     """
     Performs a breadth-first search or a depth-first search on graph
     starting at the start_node. The rac_class should either be a
@@ -118,27 +229,41 @@ def bfs_dfs(graph, rac_class, start_node, end_node):
           use for the search
         - start_node: a node in graph representing the start
         - end_node: a node in graph representing the end
+        - stats: a SearchStats object to record the search in, or None
 
     Returns: a dictionary associating each visited node with its parent
     node.
     """
+    if stats is not None:
+        stats.start_phase("setup")
     rac = rac_class()
     parent = {}
     for graph_node in graph.nodes():
         parent[graph_node] = None
     rac.push(start_node)
+    if stats is not None:
+        stats.push(len(rac))
+        stats.start_phase("search")
     while len(rac) > 0:
         node = rac.pop()
+        if stats is not None:
+            stats.expansions += 1
         for nbr in graph.get_neighbors(node):
 #check if nbr has been gone through or not
             if parent[nbr] == None:
                 parent[nbr] = node
                 rac.push(nbr)
+                if stats is not None:
+                    stats.push(len(rac))
                 if nbr == end_node:
+                    if stats is not None:
+                        stats.stop()
                     return parent               
+    if stats is not None:
+        stats.stop()
     return parent
     
-def dfs(graph, start_node, end_node, parent):
+def dfs(graph, start_node, end_node, parent, stats=None):
     """
     Performs a recursive depth-first search on graph starting at the
     start_node.
@@ -152,60 +277,90 @@ def dfs(graph, start_node, end_node, parent):
         - end_node: a node in graph representing the end
         - parent: a dictionary that initially has one entry associating
                   the original start_node with None
+        - stats: a SearchStats object to record expansions and pushes
+                 (recursive calls) in, or None; the recursion is not
+                 timed, use iterative_dfs for timings
 
     Modifies the input parent dictionary to associate each visited node
     with its parent node
     """
-#implement the recipe for the dfs recursive function
-#check if the neighbors of start_node are already in parent or not
-    checked = True
+    if stats is not None:
+        stats.expansions += 1
     for nbr in graph.get_neighbors(start_node):
-        if nbr not in parent.keys():
-            checked = False
-#base case: if all neighbors of start_node are already in parent    
-    if checked == True:
-        return
-#recursive case    
-    else:
-        for nbr in graph.get_neighbors(start_node):
-            if nbr not in parent.keys():
-                parent[nbr] = start_node
-                if nbr == end_node:
-                    return
-                dfs(graph, nbr, end_node, parent)
+        if nbr not in parent:
+            parent[nbr] = start_node
+            if stats is not None:
+                stats.pushes += 1
+            if nbr == end_node:
+                return
+            dfs(graph, nbr, end_node, parent, stats)
 
-def lowest_f(graph, openset, g_cost_dict, straight_line_distance, end_node):
+def iterative_dfs(graph, start_node, end_node, parent, stats=None):
     """
-    This function returns the node with the lowest f-cost in the open set in A* search.
-    This function serves as a helper function for the astar function.
-    Inputs:
+    Performs a depth-first search on graph starting at the start_node
+    using an explicit stack instead of recursion, so it cannot exceed
+    the recursion limit on deep graphs.
+
+    Visits nodes in the same order as dfs and completes as soon as
+    end_node is found or entire graph has been searched.
+
+    inputs:
         - graph: a directed Graph object representing a street map
-        - openset: a set representing the nodes to be traversed
-        - g_cost_dict: a dictionary which maps nodes to their g_costs
-        - straight_line_distance: a function which takes two nodes and
-                         a graph and returns the straight line distance 
-                         between two nodes
+        - start_node: a node in graph representing the start
         - end_node: a node in graph representing the end
-    Output: the node with the lowest f-cost in the openset
-    """    
-    f_cost = {}
-    curr_node = None
-    for node in openset: 
-        f_cost[node] = g_cost_dict[node] + straight_line_distance(node, end_node, graph)
-        for key, value in f_cost.items():
-            if value == min(f_cost.values()):
-                curr_node = key
-    return curr_node
+        - parent: a dictionary that initially has one entry associating
+                  the original start_node with None
+        - stats: a SearchStats object to record the search in, or None
 
+    Modifies the input parent dictionary to associate each visited node
+    with its parent node
+    """
+    if stats is not None:
+        stats.start_phase("search")
+        stats.expansions += 1
+        stats.push(1)
+    # Each stack entry pairs a node with an iterator over its remaining
+    # neighbors, which is exactly the state a recursive call keeps
+    stack = [(start_node, iter(graph.get_neighbors(start_node)))]
+    while len(stack) > 0:
+        node, nbrs = stack[-1]
+        for nbr in nbrs:
+            if nbr not in parent:
+                parent[nbr] = node
+                if nbr == end_node:
+                    if stats is not None:
+                        stats.stop()
+                    return
+                stack.append((nbr, iter(graph.get_neighbors(nbr))))
+                if stats is not None:
+                    stats.expansions += 1
+                    stats.push(len(stack))
+                break
+        else:
+            # All neighbors have been explored, so "return" from node
+            stack.pop()
+    if stats is not None:
+        stats.stop()
 
 def astar(graph, start_node, end_node,
-          edge_distance, straight_line_distance):
+          edge_distance, straight_line_distance, stats=None, weight=1):
     """
     Performs an A* search on graph starting at start_node.
 
     Completes when end_node is found or entire graph has been
     searched.
 
+    With a weight w greater than 1 this is weighted A*, which orders
+    the open set by g + w*h.  It usually expands far fewer nodes, and
+    the path it finds is at most w times longer than the shortest one
+    (given a consistent heuristic, such as straight line distance).
+
+    The open set is a binary heap keyed by f-cost.  Instead of
+    updating a node's entry in place when a cheaper path to it is
+    found, a new entry is pushed and the outdated one is skipped when
+    it is eventually popped (lazy deletion).  Each node's heuristic
+    value is computed only once.
+
     inputs:
         - graph: a directed Graph object representing a street map
         - start_node: a node in graph representing the start
@@ -216,43 +371,1050 @@ def astar(graph, start_node, end_node,
         - straight_line_distance: a function which takes two nodes and
                          a graph and returns the straight line distance 
                          between two nodes
+        - stats: a SearchStats object to record the search in, or None
+        - weight: a number >= 1 by which heuristic values are multiplied
 
     Returns: a dictionary associating each visited node with its parent
     node.
     """
+    if stats is not None:
+        stats.start_phase("setup")
+        edge_distance = stats.count_edge_distance(edge_distance)
+        straight_line_distance = stats.count_heuristic(straight_line_distance)
     parent = {start_node: None}
-#create a dictionary that maps the nodes to its g-cost    
+    # g-costs and (cached) heuristic values of every discovered node
     g_cost_dict = {start_node: 0}
-    
-#create the open set and the closed set    
-    openset = set()
-    closedset = set()    
-    openset.add(start_node)
-    cur_node = None 
-    
-    while len(openset) > 0:
-#find the node with the lowest f cost in the openset        
-        cur_node = lowest_f(graph, openset, g_cost_dict, straight_line_distance, end_node)
-#remove current node from the open set and add it to the closed set        
-        openset.remove(cur_node)
+    h_cost_dict = {start_node: weight * straight_line_distance(start_node, end_node, graph)}
+
+    # Heap entries are (f-cost, insertion count, node); the count breaks
+    # ties so that nodes themselves are never compared
+    openheap = [(h_cost_dict[start_node], 0, start_node)]
+    closedset = set()
+    count = 1
+    if stats is not None:
+        stats.push(1)
+        stats.start_phase("search")
+
+    while len(openheap) > 0:
+        cur_node = heapq.heappop(openheap)[2]
+        # Skip entries made stale by a later, cheaper push
+        if cur_node in closedset:
+            continue
+        if cur_node == end_node:
+            break
         closedset.add(cur_node)
-#look at the current node's neighbors
+        cur_g_cost = g_cost_dict[cur_node]
+        if stats is not None:
+            stats.expansions += 1
+
         for nbr in graph.get_neighbors(cur_node):
-            if nbr not in closedset:
-#if the nbr is not in the open set yet, add it                
-                if nbr not in openset:
+            if nbr in closedset:
+                continue
+            nbr_g_cost = cur_g_cost + edge_distance(cur_node, nbr, graph)
+            if nbr not in g_cost_dict or nbr_g_cost < g_cost_dict[nbr]:
+                g_cost_dict[nbr] = nbr_g_cost
+                parent[nbr] = cur_node
+                if nbr not in h_cost_dict:
+                    h_cost_dict[nbr] = weight * straight_line_distance(nbr, end_node, graph)
+                heapq.heappush(openheap, (nbr_g_cost + h_cost_dict[nbr], count, nbr))
+                count += 1
+                if stats is not None:
+                    stats.push(len(openheap))
+    if stats is not None:
+        stats.stop()
+    return parent
+
+def anytime_astar(graph, start_node, end_node, edge_distance,
+                  straight_line_distance, initial_weight=3, weight_step=0.5,
+                  time_budget=None, expansion_budget=None):
+    """
+    Performs an anytime (ARA*) search on graph starting at start_node.
+
+    A weighted A* search with a large weight finds a first path
+    quickly.  The weight is then lowered step by step, and each new
+    search reuses the work of the previous ones, so successively
+    shorter paths are produced until the weight reaches 1 (the path is
+    then optimal) or the budget runs out.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - start_node: a node in graph representing the start
+        - end_node: a node in graph representing the end
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+        - straight_line_distance: a function which takes two nodes and
+                         a graph and returns the straight line distance
+                         between two nodes
+        - initial_weight: a number >= 1 to weight the first search with
+        - weight_step: the amount the weight is lowered after each path
+        - time_budget: the number of seconds to search for, or None
+        - expansion_budget: the maximum number of node expansions, or None
+
+    Yields: two-element tuples containing a bound on how many times
+    longer than the shortest path the current path is, and a dictionary
+    associating each visited node with its parent node.
+    """
+    deadline = None
+    if time_budget is not None:
+        deadline = time.perf_counter() + time_budget
+    expansions = 0
+    weight = max(initial_weight, 1)
+
+    parent = {start_node: None}
+    g_cost_dict = {start_node: 0}
+    h_cost_dict = {start_node: straight_line_distance(start_node, end_node, graph)}
+    openheap = [(weight * h_cost_dict[start_node], 0, start_node)]
+    count = 1
+    closedset = set()
+    # Nodes improved after being expanded in the current search
+    inconsistent = set()
+
+    while True:
+        # Expand nodes until no open node could lead to a shorter path
+        # to end_node (under the current weight)
+        while len(openheap) > 0:
+            key, _, cur_node = openheap[0]
+            if (cur_node in closedset or
+                    key != g_cost_dict[cur_node] + weight * h_cost_dict[cur_node]):
+                heapq.heappop(openheap)
+                continue
+            if g_cost_dict.get(end_node, float("inf")) <= key:
+                break
+            if ((expansion_budget is not None and expansions >= expansion_budget) or
+                    (deadline is not None and time.perf_counter() >= deadline)):
+                return
+            heapq.heappop(openheap)
+            closedset.add(cur_node)
+            expansions += 1
+            cur_g_cost = g_cost_dict[cur_node]
+            for nbr in graph.get_neighbors(cur_node):
+                nbr_g_cost = cur_g_cost + edge_distance(cur_node, nbr, graph)
+                if nbr_g_cost < g_cost_dict.get(nbr, float("inf")):
+                    g_cost_dict[nbr] = nbr_g_cost
                     parent[nbr] = cur_node
-                    openset.add(nbr)
-                    g_cost_dict[nbr] = g_cost_dict[cur_node] + edge_distance(cur_node, nbr, graph)
-                elif nbr in openset:
-                    nbr_g_cost = g_cost_dict[cur_node] + edge_distance(cur_node, nbr, graph)
-                    if nbr_g_cost < g_cost_dict[nbr]:
-                        g_cost_dict[nbr] = nbr_g_cost
-                        parent[nbr] = cur_node
+                    if nbr not in h_cost_dict:
+                        h_cost_dict[nbr] = straight_line_distance(nbr, end_node, graph)
+                    if nbr in closedset:
+                        inconsistent.add(nbr)
+                    else:
+                        heapq.heappush(openheap, (nbr_g_cost + weight * h_cost_dict[nbr],
+                                                  count, nbr))
+                        count += 1
+
+        if end_node not in g_cost_dict:
+            return
+
+        # Every node that may still improve the path is open or
+        # inconsistent; the smallest unweighted f-cost among them is a
+        # lower bound on the shortest path length
+        pending = set(inconsistent)
+        for entry in openheap:
+            if entry[2] not in closedset:
+                pending.add(entry[2])
+        if len(pending) == 0:
+            bound = 1
+        else:
+            lower = min(g_cost_dict[node] + h_cost_dict[node] for node in pending)
+            bound = weight
+            if lower > 0:
+                bound = min(weight, g_cost_dict[end_node] / lower)
+            bound = max(bound, 1)
+        yield bound, dict(parent)
+        if bound <= 1:
+            return
+
+        # Start the next, less greedy search from the pending nodes
+        weight = max(weight - weight_step, 1)
+        openheap = []
+        for node in pending:
+            openheap.append((g_cost_dict[node] + weight * h_cost_dict[node], count, node))
+            count += 1
+        heapq.heapify(openheap)
+        closedset = set()
+        inconsistent = set()
+
+def reverse_neighbors(graph):
+    """
+    Computes the reverse adjacency of a directed graph.  Build this once
+    per graph and pass it to every bidirectional_astar query.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+
+    Returns: a dictionary associating each node with a list of the
+    nodes that have an edge to it.
+    """
+    reverse = {}
+    for node in graph.nodes():
+        reverse[node] = []
+    for node in graph.nodes():
+        for nbr in graph.get_neighbors(node):
+            reverse[nbr].append(node)
+    return reverse
+
+def bidirectional_astar(graph, start_node, end_node, edge_distance,
+                        straight_line_distance=None, reverse=None):
+    """
+    Performs a bidirectional A* search on graph, searching forward
+    from start_node and backward from end_node until the two searches
+    meet.  Without a straight_line_distance function this is a
+    bidirectional Dijkstra search.
+
+    Both searches use the average of the forward and backward
+    heuristics as their potential, so the search can stop once the
+    smallest keys of the two open sets add up to at least the length
+    of the best path found so far.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - start_node: a node in graph representing the start
+        - end_node: a node in graph representing the end
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+        - straight_line_distance: a function which takes two nodes and
+                         a graph and returns the straight line distance
+                         between two nodes, or None
+        - reverse: the result of reverse_neighbors(graph), or None to
+                   build it for this query
+
+    Returns: a dictionary associating each node visited by the forward
+    search with its parent node, in which following parents back from
+    end_node gives the shortest path from start_node.
+    """
+    if reverse is None:
+        reverse = reverse_neighbors(graph)
+
+    potentials = {}
+    def potential(node):
+        """
+        Returns: the (cached) forward potential of node; the backward
+        search uses its negation.
+        """
+        if straight_line_distance is None:
+            return 0
+        if node not in potentials:
+            potentials[node] = (straight_line_distance(node, end_node, graph) -
+                                straight_line_distance(start_node, node, graph)) / 2
+        return potentials[node]
+
+    parent = {start_node: None}
+    if start_node == end_node:
+        return parent
+    # Per direction: g-costs, parents, closed set and open heap.  In the
+    # backward direction "parent" is the next node towards end_node.
+    g_costs = ({start_node: 0}, {end_node: 0})
+    parents = (parent, {end_node: None})
+    closedsets = (set(), set())
+    openheaps = ([(potential(start_node), 0, start_node)],
+                 [(-potential(end_node), 0, end_node)])
+    signs = (1, -1)
+    count = 1
+    best_cost = float("inf")
+    meet_node = None
+
+    while len(openheaps[0]) > 0 and len(openheaps[1]) > 0:
+        # Discard stale entries so the stopping test is as tight as possible
+        for side in (0, 1):
+            while (len(openheaps[side]) > 0 and
+                   openheaps[side][0][2] in closedsets[side]):
+                heapq.heappop(openheaps[side])
+        if len(openheaps[0]) == 0 or len(openheaps[1]) == 0:
+            break
+        if openheaps[0][0][0] + openheaps[1][0][0] >= best_cost:
+            break
+
+        # Expand the direction with the smaller open set
+        side = 0 if len(openheaps[0]) <= len(openheaps[1]) else 1
+        g_cost_dict = g_costs[side]
+        other_g_cost_dict = g_costs[1 - side]
+        cur_node = heapq.heappop(openheaps[side])[2]
+        closedsets[side].add(cur_node)
+        cur_g_cost = g_cost_dict[cur_node]
+
+        if side == 0:
+            nbrs = graph.get_neighbors(cur_node)
+        else:
+            nbrs = reverse[cur_node]
+        for nbr in nbrs:
+            if nbr in closedsets[side]:
+                continue
+            if side == 0:
+                nbr_g_cost = cur_g_cost + edge_distance(cur_node, nbr, graph)
+            else:
+                nbr_g_cost = cur_g_cost + edge_distance(nbr, cur_node, graph)
+            if nbr not in g_cost_dict or nbr_g_cost < g_cost_dict[nbr]:
+                g_cost_dict[nbr] = nbr_g_cost
+                parents[side][nbr] = cur_node
+                heapq.heappush(openheaps[side],
+                               (nbr_g_cost + signs[side] * potential(nbr),
+                                count, nbr))
+                count += 1
+                # Check whether this connects the two searches
+                if nbr in other_g_cost_dict:
+                    total = nbr_g_cost + other_g_cost_dict[nbr]
+                    if total < best_cost:
+                        best_cost = total
+                        meet_node = nbr
+
+    if meet_node is None:
+        return parent
+    # Splice the backward half of the path into the forward parents
+    node = meet_node
+    while parents[1][node] is not None:
+        next_node = parents[1][node]
+        parent[next_node] = node
+        node = next_node
     return parent
 
+def shortest_distances(graph, start_node, edge_distance, reverse=None,
+                       targets=None):
+    """
+    Performs a Dijkstra search over the entire graph starting at
+    start_node.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - start_node: a node in graph representing the start
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+        - reverse: the result of reverse_neighbors(graph) to search
+                   backward, finding distances *to* start_node, or None
+                   to search forward
+        - targets: a collection of nodes; if given, the search stops
+                   once all of them have been reached
+
+    Returns: a dictionary associating each reached node with its
+    distance from (or to) start_node.  Only the distances of start_node,
+    of targets and of nodes closer than the farthest target are final
+    when targets is given.
+    """
+    dist = {start_node: 0}
+    openheap = [(0, start_node)]
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        remaining.discard(start_node)
+    while len(openheap) > 0:
+        cur_dist, cur_node = heapq.heappop(openheap)
+        if cur_dist > dist[cur_node]:
+            continue
+        if remaining is not None:
+            remaining.discard(cur_node)
+            if len(remaining) == 0:
+                break
+        if reverse is None:
+            for nbr in graph.get_neighbors(cur_node):
+                new_dist = cur_dist + edge_distance(cur_node, nbr, graph)
+                if new_dist < dist.get(nbr, float("inf")):
+                    dist[nbr] = new_dist
+                    heapq.heappush(openheap, (new_dist, nbr))
+        else:
+            for nbr in reverse[cur_node]:
+                new_dist = cur_dist + edge_distance(nbr, cur_node, graph)
+                if new_dist < dist.get(nbr, float("inf")):
+                    dist[nbr] = new_dist
+                    heapq.heappush(openheap, (new_dist, nbr))
+    return dist
+
+class LandmarkHeuristic:
+    """
+    An ALT (A*, landmarks, triangle inequality) heuristic.
+
+    Distances to and from a few far-apart landmark nodes are computed
+    once per map.  By the triangle inequality they give lower bounds on
+    the distance between any two nodes that are usually much tighter
+    than the straight line distance on road networks.  An instance can
+    be passed to astar in place of straight_line_distance.
+    """
+    def __init__(self, graph, edge_distance, num_landmarks=8,
+                 reverse=None, seed=None):
+        """
+        Choose landmarks by farthest-point selection and precompute
+        their distance tables.
+
+        inputs:
+            - graph: a directed Graph object representing a street map
+            - edge_distance: a function which takes two nodes and a graph
+                             and returns the actual distance between two
+                             neighboring nodes
+            - num_landmarks: an integer representing the number of
+                             landmarks to use
+            - reverse: the result of reverse_neighbors(graph), or None
+                       to build it
+            - seed: a seed for choosing the initial node
+        """
+        if reverse is None:
+            reverse = reverse_neighbors(graph)
+        self._nodes = list(graph.nodes())
+        self._index = {}
+        for idx, node in enumerate(self._nodes):
+            self._index[node] = idx
+
+        self._landmarks = []
+        # One array per landmark of distances from it and to it
+        self._from_landmark = []
+        self._to_landmark = []
+
+        # Start from a random node, then repeatedly pick the node
+        # farthest (there and back) from every node picked so far
+        rng = random.Random(seed)
+        tables = self._tables(graph, rng.choice(self._nodes),
+                              edge_distance, reverse)
+        separation = [float("inf")] * len(self._nodes)
+        while len(self._landmarks) < min(num_landmarks, len(self._nodes)):
+            from_dist, to_dist = tables
+            for idx in range(len(self._nodes)):
+                total = from_dist[idx] + to_dist[idx]
+                if total == float("inf"):
+                    total = 0
+                if total < separation[idx]:
+                    separation[idx] = total
+            landmark = self._nodes[max(range(len(self._nodes)),
+                                       key=separation.__getitem__)]
+            tables = self._tables(graph, landmark, edge_distance, reverse)
+            self._landmarks.append(landmark)
+            self._from_landmark.append(tables[0])
+            self._to_landmark.append(tables[1])
+
+    def _tables(self, graph, node, edge_distance, reverse):
+        """
+        Returns: a tuple of two arrays holding the distance from node
+        to every node and from every node to node, indexed like
+        self._nodes (infinity where there is no path).
+        """
+        from_dist = shortest_distances(graph, node, edge_distance)
+        to_dist = shortest_distances(graph, node, edge_distance, reverse)
+        inf = float("inf")
+        return (array("d", [from_dist.get(other, inf) for other in self._nodes]),
+                array("d", [to_dist.get(other, inf) for other in self._nodes]))
+
+    def get_landmarks(self):
+        """
+        Returns: a list of the landmark nodes.
+        """
+        return list(self._landmarks)
+
+    def __call__(self, node1, node2, graph):
+        """
+        Computes a lower bound on the distance from node1 to node2.  Has
+        the same signature as straight_line_distance.
+
+        inputs:
+            - node1: a node in graph
+            - node2: a node in graph
+            - graph: a directed Graph object representing a street map
+
+        Returns: the largest lower bound given by any landmark.  This
+        is infinity when the tables show node2 is unreachable.
+        """
+        idx1 = self._index[node1]
+        idx2 = self._index[node2]
+        bound = 0
+        # d(L, node2) - d(L, node1) and d(node1, L) - d(node2, L) both
+        # bound d(node1, node2); inf - inf is nan and never compares
+        # greater, so landmarks that cannot see either node are ignored
+        for from_dist, to_dist in zip(self._from_landmark, self._to_landmark):
+            lower = from_dist[idx2] - from_dist[idx1]
+            if lower > bound:
+                bound = lower
+            lower = to_dist[idx1] - to_dist[idx2]
+            if lower > bound:
+                bound = lower
+        return bound
+
+class CSRGraph:
+    """
+    A compact, read-only copy of a street map in compressed sparse row
+    form.  Nodes are numbered 0 to n-1 and the neighbors of node i are
+    targets[offsets[i]:offsets[i + 1]], with the matching edge distances
+    precomputed in weights, so searches need no graph method or
+    edge_distance calls.
+    """
+    def __init__(self, graph, edge_distance, node_position=None):
+        """
+        Convert graph into compressed sparse row form.
+
+        inputs:
+            - graph: a directed Graph object representing a street map
+            - edge_distance: a function which takes two nodes and a graph
+                             and returns the actual distance between two
+                             neighboring nodes
+            - node_position: a function which takes a node and returns
+                             its (x, y) coordinates, in the same units as
+                             edge_distance, or None
+        """
+        self._nodes = list(graph.nodes())
+        self._index = {}
+        for idx, node in enumerate(self._nodes):
+            self._index[node] = idx
+
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.weights = array("d")
+        for node in self._nodes:
+            for nbr in graph.get_neighbors(node):
+                self.targets.append(self._index[nbr])
+                self.weights.append(edge_distance(node, nbr, graph))
+            self.offsets.append(len(self.targets))
+
+        self.xs = None
+        self.ys = None
+        if node_position is not None:
+            self.xs = array("d")
+            self.ys = array("d")
+            for node in self._nodes:
+                pos_x, pos_y = node_position(node)
+                self.xs.append(pos_x)
+                self.ys.append(pos_y)
+
+    def __len__(self):
+        """
+        Returns: an integer representing the number of nodes.
+        """
+        return len(self._nodes)
+
+    def get_index(self, node):
+        """
+        Returns: the integer index of node.
+        """
+        return self._index[node]
+
+    def get_node(self, idx):
+        """
+        Returns: the node with the integer index idx.
+        """
+        return self._nodes[idx]
+
+    def parent_dict(self, parent, start_node):
+        """
+        Converts a parent array returned by a CSR search into the
+        dictionary form returned by bfs_dfs and astar.
+
+        inputs:
+            - parent: an array associating each node index with the index
+                      of its parent, or -1
+            - start_node: a node in graph representing the start
+
+        Returns: a dictionary associating start_node and each visited
+        node with its parent node.
+        """
+        result = {start_node: None}
+        nodes = self._nodes
+        for idx, parent_idx in enumerate(parent):
+            if parent_idx >= 0:
+                result[nodes[idx]] = nodes[parent_idx]
+        return result
+
+def csr_bfs_dfs(csr, rac_class, start_node, end_node):
+    """
+    Performs a breadth-first search or a depth-first search on a
+    CSRGraph, exactly like bfs_dfs.
+
+    inputs:
+        - csr: a CSRGraph representing a street map
+        - rac_class: a restricted access container (Queue or Stack) class to
+          use for the search
+        - start_node: a node in graph representing the start
+        - end_node: a node in graph representing the end
+
+    Returns: an array associating each node index with the index of its
+    parent node, or -1 if it was not visited (see CSRGraph.parent_dict).
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    start = csr.get_index(start_node)
+    end = csr.get_index(end_node)
+    parent = array("l", [-1]) * len(csr)
+    visited = bytearray(len(csr))
+    visited[start] = 1
+    rac = rac_class()
+    rac.push(start)
+    while len(rac) > 0:
+        node = rac.pop()
+        for nbr in targets[offsets[node]:offsets[node + 1]]:
+            if not visited[nbr]:
+                visited[nbr] = 1
+                parent[nbr] = node
+                rac.push(nbr)
+                if nbr == end:
+                    return parent
+    return parent
+
+def csr_astar(csr, start_node, end_node, straight_line_distance=None, graph=None):
+    """
+    Performs an A* search on a CSRGraph, like astar.
+
+    The heuristic is the straight line distance between the stored node
+    coordinates if the CSRGraph has them.  Otherwise
+    straight_line_distance is called on graph, once per node.
+
+    inputs:
+        - csr: a CSRGraph representing a street map
+        - start_node: a node in graph representing the start
+        - end_node: a node in graph representing the end
+        - straight_line_distance: a function which takes two nodes and
+                         a graph and returns the straight line distance
+                         between two nodes, or None
+        - graph: the directed Graph object csr was built from, or None
+
+    Returns: an array associating each node index with the index of its
+    parent node, or -1 if it was not visited (see CSRGraph.parent_dict).
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    weights = csr.weights
+    start = csr.get_index(start_node)
+    end = csr.get_index(end_node)
+    num_nodes = len(csr)
+    parent = array("l", [-1]) * num_nodes
+    g_cost = array("d", [float("inf")]) * num_nodes
+    closed = bytearray(num_nodes)
+
+    # Heuristic values are computed the first time a node is reached;
+    # a negative value means "not computed yet"
+    h_cost = array("d", [-1.0]) * num_nodes
+    xs = csr.xs
+    ys = csr.ys
+    def heuristic(node):
+        """
+        Returns: the (cached) heuristic value of the node index.
+        """
+        if h_cost[node] < 0:
+            if xs is not None:
+                h_cost[node] = math.hypot(xs[node] - xs[end], ys[node] - ys[end])
+            elif straight_line_distance is not None:
+                h_cost[node] = straight_line_distance(csr.get_node(node),
+                                                      end_node, graph)
+            else:
+                h_cost[node] = 0.0
+        return h_cost[node]
+
+    g_cost[start] = 0.0
+    openheap = [(heuristic(start), start)]
+    while len(openheap) > 0:
+        cur = heapq.heappop(openheap)[1]
+        if closed[cur]:
+            continue
+        if cur == end:
+            return parent
+        closed[cur] = 1
+        cur_g_cost = g_cost[cur]
+        for edge in range(offsets[cur], offsets[cur + 1]):
+            nbr = targets[edge]
+            if closed[nbr]:
+                continue
+            nbr_g_cost = cur_g_cost + weights[edge]
+            if nbr_g_cost < g_cost[nbr]:
+                g_cost[nbr] = nbr_g_cost
+                parent[nbr] = cur
+                heapq.heappush(openheap, (nbr_g_cost + heuristic(nbr), nbr))
+    return parent
+
+# Per-process state for distance_matrix workers, set once by
+# _init_matrix_worker so the graph is not sent along with every task
+_matrix_worker = {}
+
+def _init_matrix_worker(graph, edge_distance, targets):
+    """
+    Stores the inputs shared by every task in a distance_matrix worker
+    process.
+    """
+    _matrix_worker["graph"] = graph
+    _matrix_worker["edge_distance"] = edge_distance
+    _matrix_worker["targets"] = targets
+
+def _matrix_row(source):
+    """
+    Returns: an array of the distances from source to each target of
+    the current distance_matrix worker.
+    """
+    targets = _matrix_worker["targets"]
+    dist = shortest_distances(_matrix_worker["graph"], source,
+                              _matrix_worker["edge_distance"],
+                              targets=targets)
+    inf = float("inf")
+    return array("d", [dist.get(target, inf) for target in targets])
+
+def distance_matrix(graph, sources, targets, edge_distance, num_workers=None):
+    """
+    Computes the shortest distance from every source to every target,
+    running one Dijkstra search per source.  The sources are spread
+    across a pool of worker processes, each of which receives the graph
+    only once.
+
+    edge_distance must be a module-level function so that it can be
+    sent to the workers.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - sources: a list of nodes in graph to measure distances from
+        - targets: a list of nodes in graph to measure distances to
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+        - num_workers: an integer representing the number of worker
+                       processes, None to use one per CPU, or 1 to
+                       compute everything in this process
+
+    Returns: a two-element tuple containing the distance matrix, as a
+    list with one array of target distances per source (infinity where
+    there is no path), and the throughput in source-target pairs per
+    second.
+    """
+    targets = list(targets)
+    before = time.perf_counter()
+    if num_workers == 1:
+        _init_matrix_worker(graph, edge_distance, targets)
+        matrix = [_matrix_row(source) for source in sources]
+        _matrix_worker.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_matrix_worker,
+                                 initargs=(graph, edge_distance, targets)) as pool:
+            matrix = list(pool.map(_matrix_row, sources))
+    elapsed = time.perf_counter() - before
+    pairs = len(matrix) * len(targets)
+    if elapsed > 0:
+        pairs_per_second = pairs / elapsed
+    else:
+        pairs_per_second = float("inf")
+    return matrix, pairs_per_second
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy built over a street map.  Building it is
+    slow, but afterwards it answers shortest path queries on the same
+    map much faster than astar, and it can be saved to disk and loaded
+    again so the preprocessing only needs to happen once per map.
+    """
+    def __init__(self, graph, edge_distance, witness_limit=50):
+        """
+        Contract every node of graph, in order of increasing importance,
+        adding shortcut edges wherever contracting a node would otherwise
+        lengthen a shortest path.
+
+        inputs:
+            - graph: a directed Graph object representing a street map
+            - edge_distance: a function which takes two nodes and a graph
+                             and returns the actual distance between two
+                             neighboring nodes
+            - witness_limit: the maximum number of nodes settled by each
+                             search for a path that makes a shortcut
+                             unnecessary
+        """
+        out_edges = {}
+        in_edges = {}
+        for node in graph.nodes():
+            out_edges[node] = {}
+            in_edges[node] = {}
+        for node in graph.nodes():
+            for nbr in graph.get_neighbors(node):
+                if nbr == node:
+                    continue
+                dist = edge_distance(node, nbr, graph)
+                if nbr not in out_edges[node] or dist < out_edges[node][nbr]:
+                    out_edges[node][nbr] = dist
+                    in_edges[nbr][node] = dist
+
+        # Maps each shortcut (u, w) to the node it bypasses
+        self._middle = {}
+        self._rank = {}
+        # The forward search only follows edges up the hierarchy, and
+        # the backward search only follows reversed edges up it
+        self._up = {}
+        self._down = {}
+        deleted_nbrs = defaultdict(int)
+
+        def needed_shortcuts(node):
+            """
+            Returns: a list of (u, w, distance) shortcuts that contracting
+            node would require.
+            """
+            shortcuts = []
+            for pred, pred_dist in in_edges[node].items():
+                targets = {}
+                for succ, succ_dist in out_edges[node].items():
+                    if succ != pred:
+                        targets[succ] = pred_dist + succ_dist
+                if len(targets) == 0:
+                    continue
+                witness = self._witness_search(out_edges, pred, node,
+                                               max(targets.values()), witness_limit)
+                for succ, dist in targets.items():
+                    if witness.get(succ, float("inf")) > dist:
+                        shortcuts.append((pred, succ, dist))
+            return shortcuts
+
+        def priority(node):
+            """
+            Returns: a tuple of the contraction priority of node (its
+            edge difference plus the number of contracted neighbors) and
+            the shortcuts it needs.
+            """
+            shortcuts = needed_shortcuts(node)
+            removed = len(in_edges[node]) + len(out_edges[node])
+            return len(shortcuts) - removed + deleted_nbrs[node], shortcuts
+
+        order = []
+        for count, node in enumerate(graph.nodes()):
+            order.append((priority(node)[0], count, node))
+        heapq.heapify(order)
+        count = len(order)
+
+        # Lazily re-evaluate priorities as nodes are contracted
+        while len(order) > 0:
+            node = heapq.heappop(order)[2]
+            node_priority, shortcuts = priority(node)
+            if len(order) > 0 and node_priority > order[0][0]:
+                heapq.heappush(order, (node_priority, count, node))
+                count += 1
+                continue
+            for pred, succ, dist in shortcuts:
+                if dist < out_edges[pred].get(succ, float("inf")):
+                    out_edges[pred][succ] = dist
+                    in_edges[succ][pred] = dist
+                    self._middle[(pred, succ)] = node
+
+            # Every remaining neighbor will be ranked above node, so its
+            # remaining edges are final; remove them from the graph
+            self._rank[node] = len(self._rank)
+            self._up[node] = list(out_edges[node].items())
+            self._down[node] = list(in_edges[node].items())
+            for succ in out_edges[node]:
+                del in_edges[succ][node]
+                deleted_nbrs[succ] += 1
+            for pred in in_edges[node]:
+                del out_edges[pred][node]
+                deleted_nbrs[pred] += 1
+            del out_edges[node]
+            del in_edges[node]
+
+    @staticmethod
+    def _witness_search(out_edges, source, skip_node, max_dist, limit):
+        """
+        Runs a bounded Dijkstra search from source over the
+        uncontracted graph that ignores skip_node.
+
+        Returns: a dictionary associating each reached node with its
+        (tentative) distance from source.
+        """
+        dist = {source: 0}
+        openheap = [(0, source)]
+        settled = 0
+        while len(openheap) > 0 and settled < limit:
+            cur_dist, cur_node = heapq.heappop(openheap)
+            if cur_dist > dist[cur_node]:
+                continue
+            if cur_dist > max_dist:
+                break
+            settled += 1
+            for nbr, nbr_dist in out_edges[cur_node].items():
+                if nbr == skip_node:
+                    continue
+                new_dist = cur_dist + nbr_dist
+                if new_dist < dist.get(nbr, float("inf")):
+                    dist[nbr] = new_dist
+                    heapq.heappush(openheap, (new_dist, nbr))
+        return dist
+
+    def save(self, filename):
+        """
+        Write the hierarchy to a file.
+
+        input:
+            - filename: a string representing the name of the file
+        """
+        with open(filename, "wb") as file:
+            pickle.dump((self._rank, self._up, self._down, self._middle),
+                        file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a hierarchy previously written by save.
+
+        input:
+            - filename: a string representing the name of the file
+
+        Returns: the ContractionHierarchy stored in the file.
+        """
+        hierarchy = cls.__new__(cls)
+        with open(filename, "rb") as file:
+            (hierarchy._rank, hierarchy._up,
+             hierarchy._down, hierarchy._middle) = pickle.load(file)
+        return hierarchy
+
+    def query(self, start_node, end_node):
+        """
+        Finds a shortest path from start_node to end_node.
+
+        inputs:
+            - start_node: a node in graph representing the start
+            - end_node: a node in graph representing the end
+
+        Returns: a dictionary associating each node on the shortest path
+        with its parent node, or only start_node with None if end_node
+        cannot be reached.
+        """
+        dists = ({start_node: 0}, {end_node: 0})
+        parents = ({start_node: None}, {end_node: None})
+        openheaps = ([(0, start_node)], [(0, end_node)])
+        edges = (self._up, self._down)
+        best_dist = float("inf")
+        meet_node = None
+        if start_node == end_node:
+            meet_node = start_node
+
+        while len(openheaps[0]) > 0 or len(openheaps[1]) > 0:
+            for side in (0, 1):
+                if len(openheaps[side]) == 0:
+                    continue
+                cur_dist, cur_node = heapq.heappop(openheaps[side])
+                if cur_dist > dists[side][cur_node]:
+                    continue
+                # Nothing left in this direction can improve the path
+                if cur_dist >= best_dist:
+                    openheaps[side].clear()
+                    continue
+                if cur_node in dists[1 - side]:
+                    total = cur_dist + dists[1 - side][cur_node]
+                    if total < best_dist:
+                        best_dist = total
+                        meet_node = cur_node
+                for nbr, nbr_dist in edges[side][cur_node]:
+                    new_dist = cur_dist + nbr_dist
+                    if new_dist < dists[side].get(nbr, float("inf")):
+                        dists[side][nbr] = new_dist
+                        parents[side][nbr] = cur_node
+                        heapq.heappush(openheaps[side], (new_dist, nbr))
+
+        if meet_node is None:
+            return {start_node: None}
+
+        # Path through the hierarchy: start -> meet -> end
+        path = []
+        node = meet_node
+        while node is not None:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][meet_node]
+        while node is not None:
+            path.append(node)
+            node = parents[1][node]
+
+        # Replace every shortcut with the edges it stands for
+        parent = {start_node: None}
+        prev_node = start_node
+        for idx in range(len(path) - 1):
+            stack = [(path[idx], path[idx + 1])]
+            while len(stack) > 0:
+                tail, head = stack.pop()
+                if (tail, head) in self._middle:
+                    middle = self._middle[(tail, head)]
+                    stack.append((middle, head))
+                    stack.append((tail, middle))
+                else:
+                    parent[head] = prev_node
+                    prev_node = head
+        return parent
+
+def path_length(graph, parent, start_node, end_node, edge_distance):
+    """
+    Computes the length of the path to end_node described by a parent
+    dictionary.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - parent: a dictionary associating nodes with their parent node
+        - start_node: a node in graph representing the start
+        - end_node: a node in graph representing the end
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+
+    Returns: the length of the path, or infinity if parent does not
+    reach end_node.
+    """
+    if end_node not in parent:
+        return float("inf")
+    total = 0
+    node = end_node
+    while node != start_node:
+        total += edge_distance(parent[node], node, graph)
+        node = parent[node]
+    return total
+
+def benchmark_contraction_hierarchy(graph, edge_distance, straight_line_distance,
+                                    num_queries=100, filename=None, seed=None):
+    """
+    Times astar against a ContractionHierarchy on the same random
+    queries and prints the results.
+
+    inputs:
+        - graph: a directed Graph object representing a street map
+        - edge_distance: a function which takes two nodes and a graph
+                         and returns the actual distance between two
+                         neighboring nodes
+        - straight_line_distance: a function which takes two nodes and
+                         a graph and returns the straight line distance
+                         between two nodes
+        - num_queries: an integer representing the number of queries
+        - filename: a string naming a file to save the hierarchy to and
+                    load it back from, or None to skip that step
+        - seed: a seed for choosing the queries
+
+    Returns: a dictionary with the preprocessing time, the average
+    query time of each method in seconds and the number of queries on
+    which the two path lengths disagreed.
+    """
+    rng = random.Random(seed)
+    nodes = list(graph.nodes())
+    queries = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(num_queries)]
+
+    before = time.perf_counter()
+    hierarchy = ContractionHierarchy(graph, edge_distance)
+    preprocess_time = time.perf_counter() - before
+    if filename is not None:
+        hierarchy.save(filename)
+        hierarchy = ContractionHierarchy.load(filename)
+
+    astar_lengths = []
+    before = time.perf_counter()
+    for start_node, end_node in queries:
+        parent = astar(graph, start_node, end_node,
+                       edge_distance, straight_line_distance)
+        astar_lengths.append(path_length(graph, parent, start_node,
+                                         end_node, edge_distance))
+    astar_time = (time.perf_counter() - before) / num_queries
+
+    ch_lengths = []
+    before = time.perf_counter()
+    for start_node, end_node in queries:
+        parent = hierarchy.query(start_node, end_node)
+        ch_lengths.append(path_length(graph, parent, start_node,
+                                      end_node, edge_distance))
+    ch_time = (time.perf_counter() - before) / num_queries
+
+    mismatches = 0
+    for astar_length, ch_length in zip(astar_lengths, ch_lengths):
+        if not math.isclose(astar_length, ch_length):
+            mismatches += 1
+
+    print("Preprocessing: %.3f s" % preprocess_time)
+    print("astar:         %.3f ms/query" % (astar_time * 1000))
+    print("hierarchy:     %.3f ms/query" % (ch_time * 1000))
+    print("Mismatched path lengths: %d of %d" % (mismatches, num_queries))
+    return {"preprocess_time": preprocess_time, "astar_time": astar_time,
+            "hierarchy_time": ch_time, "mismatches": mismatches}
+
 # You can replace functions/classes you have not yet implemented with
 # None in the call to "maps.start" below and the other elements will
-# work.
+# work.  The start call is guarded so that worker processes (see
+# distance_matrix) can import this module without opening the GUI.
 
-maps.start(bfs_dfs, Queue, Stack, dfs, astar)
+if __name__ == "__main__":
+    maps.start(bfs_dfs, Queue, Stack, iterative_dfs, astar)
@@ -2,9 +2,10 @@
 QR Code Generator
 """
 
+import time
+from concurrent.futures import ProcessPoolExecutor
 import comp140_module5 as qrcode
-import comp140_module5_z256 as z256
-from collections import defaultdict
+import gf256
 
 def divide_terms(coefficient1, power1, coefficient2, power2):
     """
@@ -23,7 +24,7 @@ def divide_terms(coefficient1, power1, coefficient2, power2):
     term.
     """
     # From recipe: (a*x^b) / (c*x^d) = (a/c) * x^(b-d)
-    new_coeff = z256.div(coefficient1, coefficient2)
+    new_coeff = gf256.div(coefficient1, coefficient2)
     new_pow = power1 - power2
 
     # Represent our answer as a Polynomial
@@ -31,14 +32,220 @@ def divide_terms(coefficient1, power1, coefficient2, power2):
     divided = divided.add_term(new_coeff, new_pow)
     return divided
 
+class DensePolynomial:
+    """
+    A mutable polynomial in the finite field Z_256, stored as a
+    bytearray of coefficients in which entry i is the coefficient of
+    x^i.  Trailing zero coefficients are always trimmed, so the degree
+    is simply the length minus one and equality is a byte comparison.
+
+    The i* methods change the polynomial in place and operate on whole
+    rows of coefficients at a time through the gf256 module.
+    """
+    __slots__ = ("_coeffs",)
+
+    def __init__(self, coefficients=b""):
+        """
+        Creates a new DensePolynomial.
+
+        inputs:
+            - coefficients: a bytes-like object in which entry i is the
+              coefficient of x^i
+        """
+        self._coeffs = bytearray(coefficients)
+        self._trim()
+
+    @classmethod
+    def from_terms(cls, terms):
+        """
+        Creates a new DensePolynomial from a dictionary of terms.
+
+        inputs:
+            - terms: a dictionary of terms mapping (non-negative) powers
+              to coefficients
+
+        Returns: the new DensePolynomial.  Raises ValueError if any
+        power is negative.
+        """
+        if any(power < 0 for power in terms):
+            raise ValueError("powers must not be negative")
+        coeffs = bytearray(max(terms, default=-1) + 1)
+        for power, coefficient in terms.items():
+            coeffs[power] = coefficient
+        return cls(coeffs)
+
+    def _trim(self):
+        """
+        Remove zero coefficients from the top of the polynomial.
+        """
+        coeffs = self._coeffs
+        if len(coeffs) > 0 and coeffs[-1] == 0:
+            del coeffs[len(coeffs.rstrip(b"\x00")):]
+
+    def __str__(self):
+        """
+        Returns: a string representation of the polynomial, containing the
+        class name and all of the terms.
+        """
+        term_strings = []
+        for power in range(len(self._coeffs) - 1, -1, -1):
+            coefficient = self._coeffs[power]
+            if coefficient != 0:
+                if power == 0:
+                    term_strings.append("%d" % coefficient)
+                else:
+                    term_strings.append("%d*x^%d" % (coefficient, power))
+        terms_str = " + ".join(term_strings)
+        if terms_str == "":
+            terms_str = "0"
+        return "Polynomial: %s" % terms_str
+
+    def __eq__(self, other_polynomial):
+        """
+        Returns: True if other_polynomial is a DensePolynomial with the
+        same terms as self, False otherwise.
+        """
+        if not isinstance(other_polynomial, DensePolynomial):
+            return False
+        return self._coeffs == other_polynomial._coeffs
+
+    def __ne__(self, other_polynomial):
+        """
+        Returns: False if other_polynomial is a DensePolynomial with the
+        same terms as self, True otherwise.
+        """
+        return not self.__eq__(other_polynomial)
+
+    def copy(self):
+        """
+        Returns: a new DensePolynomial with the same terms.
+        """
+        return DensePolynomial(self._coeffs)
+
+    def get_coefficients(self):
+        """
+        Returns: a bytes object in which entry i is the coefficient of x^i.
+        """
+        return bytes(self._coeffs)
+
+    def get_terms(self):
+        """
+        Returns: a dictionary of the non-zero terms, mapping powers to
+        coefficients.
+        """
+        terms = {}
+        for power, coefficient in enumerate(self._coeffs):
+            if coefficient != 0:
+                terms[power] = coefficient
+        return terms
+
+    def get_degree(self):
+        """
+        Returns: the maximum power over all non-zero terms (0 for the
+        zero polynomial).
+        """
+        return max(len(self._coeffs) - 1, 0)
+
+    def get_coefficient(self, power):
+        """
+        Returns: the coefficient of x^(power), or 0 if there is none.
+        """
+        if 0 <= power < len(self._coeffs):
+            return self._coeffs[power]
+        return 0
+
+    def iadd_term(self, coefficient, power):
+        """
+        Add (coefficient) * x^(power) to this polynomial in place.
+        Raises ValueError if power is negative.
+        """
+        if power < 0:
+            raise ValueError("powers must not be negative")
+        coeffs = self._coeffs
+        if power >= len(coeffs):
+            coeffs.extend(bytes(power + 1 - len(coeffs)))
+        coeffs[power] ^= coefficient
+        self._trim()
+
+    isub_term = iadd_term
+
+    def imul_term(self, coefficient, power):
+        """
+        Multiply this polynomial by (coefficient) * x^(power) in place.
+        Raises ValueError if power is negative.
+        """
+        if power < 0:
+            raise ValueError("powers must not be negative")
+        if coefficient == 0 or len(self._coeffs) == 0:
+            self._coeffs = bytearray()
+            return
+        self._coeffs = bytearray(bytes(power) + gf256.scale_row(self._coeffs, coefficient))
+
+    def iadd_polynomial(self, other_polynomial, shift=0):
+        """
+        Add other_polynomial, multiplied by x^(shift), to this
+        polynomial in place.
+        """
+        coeffs = self._coeffs
+        other = other_polynomial._coeffs
+        end = shift + len(other)
+        if end > len(coeffs):
+            coeffs.extend(bytes(end - len(coeffs)))
+        coeffs[shift:end] = gf256.add_rows(coeffs[shift:end], other)
+        self._trim()
+
+    isub_polynomial = iadd_polynomial
+
+    def imul_polynomial(self, other_polynomial):
+        """
+        Multiply this polynomial by other_polynomial in place.
+        """
+        coeffs = self._coeffs
+        other = other_polynomial._coeffs
+        if len(coeffs) == 0 or len(other) == 0:
+            self._coeffs = bytearray()
+            return
+        # One scaled, shifted row of this polynomial per term of the other
+        product = bytearray(len(coeffs) + len(other) - 1)
+        for power, coefficient in enumerate(other):
+            if coefficient != 0:
+                end = power + len(coeffs)
+                product[power:end] = gf256.add_rows(
+                    product[power:end], gf256.scale_row(coeffs, coefficient))
+        self._coeffs = product
+        self._trim()
+
+    def iremainder(self, denominator):
+        """
+        Replace this polynomial with the remainder after dividing it by
+        denominator, in place.
+        """
+        coeffs = self._coeffs
+        divisor = denominator._coeffs
+        if len(divisor) == 0:
+            raise ZeroDivisionError("division by the zero polynomial")
+        lead = divisor[-1]
+        # Cancel the top term of the numerator with a multiple of the
+        # denominator until the numerator is shorter than it
+        while len(coeffs) >= len(divisor):
+            shift = len(coeffs) - len(divisor)
+            factor = gf256.div(coeffs[-1], lead)
+            coeffs[shift:] = gf256.add_rows(coeffs[shift:],
+                                            gf256.scale_row(divisor, factor))
+            self._trim()
+
 class Polynomial:
     """
     A class used to abstract methods on a polynomial in the finite
     field Z_256 (including numbers from 0 through 255).
 
     Since 256 is not prime, but is rather of the form p^n = 2^8, this
-    representation uses special arithmetic via the z256 module so as to
+    representation uses special arithmetic via the gf256 module so as to
     preserve multiplicative inverses (division) inside this field.
+
+    Polynomial objects never change; every operation returns a new one.
+    They are a thin wrapper around DensePolynomial, which can be used
+    directly to avoid the copies.
     """
 
     def __init__(self, terms=None):
@@ -52,37 +259,36 @@ class Polynomial:
               (None indicates that all coefficients are 0)
         """
         if terms != None:
-            self._terms = dict(terms)
+            self._dense = DensePolynomial.from_terms(terms)
         else:
-            self._terms = {}
+            self._dense = DensePolynomial()
+
+    @classmethod
+    def from_dense(cls, dense):
+        """
+        Wraps a DensePolynomial, which must not be changed afterwards.
+
+        inputs:
+            - dense: a DensePolynomial
+
+        Returns: a Polynomial with the same terms.
+        """
+        polynomial = cls()
+        polynomial._dense = dense
+        return polynomial
+
+    def to_dense(self):
+        """
+        Returns: a new DensePolynomial with the same terms.
+        """
+        return self._dense.copy()
 
     def __str__(self):
         """
         Returns: a string representation of the polynomial, containing the
         class name and all of the terms.
         """
-        # Create a string of the form "ax^n + bx^n-1 + ... + c" by
-        # creating a string representation of each term, and inserting
-        # " + " in between each
-        term_strings = []
-
-        # Add the highest powers first
-        powers = list(self._terms.keys())
-        powers.sort(reverse=True)
-        for power in powers:
-            coefficient = self._terms[power]
-            # Don't print out terms with a zero coefficient
-            if coefficient != 0:
-                # Don't print "x^0"; that just means it's a constant
-                if power == 0:
-                    term_strings.append("%d" % coefficient)
-                else:
-                    term_strings.append("%d*x^%d" % (coefficient, power))
-
-        terms_str = " + ".join(term_strings)
-        if terms_str == "":
-            terms_str = "0"
-        return "Polynomial: %s" % terms_str
+        return str(self._dense)
 
     def __eq__(self, other_polynomial):
         """
@@ -97,27 +303,7 @@ class Polynomial:
         # Make sure that other_polynomial is a Polynomial
         if not isinstance(other_polynomial, Polynomial):
             return False
-
-        # Get the terms of the other_polynomial
-        terms = other_polynomial.get_terms()
-
-        # Check that all terms in other_polynomial appear in self
-        for power, coefficient in terms.items():
-            if coefficient != 0:
-                if power not in self._terms:
-                    return False
-                if self._terms[power] != coefficient:
-                    return False
-
-        # Check that all terms in self appear in other_polynomial
-        for power, coefficient in self._terms.items():
-            if coefficient != 0:
-                if power not in terms:
-                    return False
-                if terms[power] != coefficient:
-                    return False
-
-        return True
+        return self._dense == other_polynomial._dense
 
     def __ne__(self, other_polynomial):
         """
@@ -137,23 +323,13 @@ class Polynomial:
         This dictionary is a completely new object and is not a reference
         to any internal structures.
         """
-        terms = dict(self._terms)
-        return terms
+        return self._dense.get_terms()
 
     def get_degree(self):
         """
         Returns: the maximum power over all terms in this polynomial.
         """
-        # Since we don't clean zero-coefficient powers out of our dictionary,
-        # we need a trickier get_degree function, to take into account that
-        # some coefficients could be zero.
-        highest_power = 0
-        for power in self._terms:
-            if (power > highest_power) and (self._terms[power] != 0):
-                highest_power = power
-
-        return highest_power
-
+        return self._dense.get_degree()
 
     def get_coefficient(self, power):
         """
@@ -167,10 +343,7 @@ class Polynomial:
         Returns: a Z_256 number that is the coefficient or 0 if there
                  is no term of the given power
         """
-        if power in self._terms:
-            return self._terms[power]
-        else:
-            return 0
+        return self._dense.get_coefficient(power)
 
     def add_term(self, coefficient, power):
         """
@@ -184,18 +357,9 @@ class Polynomial:
         to (coefficient) * x^(power) using Z_256 arithmetic to add
         coefficients, if necessary.
         """
-        # Replace with your code for part 3.A
-#create a new dictionary that initially represents the same polynomial
-#as the given polynomial, but eventually becomes the representation
-#for the added polynomial
-        new_terms = defaultdict(int)
-        poly_dict = self.get_terms()
-        for powe, coeff in poly_dict.items():
-            new_terms[powe] = coeff
-        current_coeff = new_terms[power]
-        new_terms[power] = z256.add(current_coeff, coefficient)
-        added_poly = Polynomial(new_terms)
-        return added_poly
+        added = self._dense.copy()
+        added.iadd_term(coefficient, power)
+        return Polynomial.from_dense(added)
 
     def subtract_term(self, coefficient, power):
         """
@@ -209,16 +373,9 @@ class Polynomial:
         and (coefficient) * x^(power) using Z_256 arithmetic to subtract
         coefficients, if necessary.
         """
-        # Replace with your code for part 3.B
-#similar to above
-        new_terms = defaultdict(int)
-        poly_dict = self.get_terms()
-        for powe, coeff in poly_dict.items():
-            new_terms[powe] = coeff
-        current_coeff = new_terms[power]
-        new_terms[power] = z256.sub(current_coeff, coefficient)
-        subtracted_poly = Polynomial(new_terms)
-        return subtracted_poly
+        subtracted = self._dense.copy()
+        subtracted.isub_term(coefficient, power)
+        return Polynomial.from_dense(subtracted)
 
     def multiply_by_term(self, coefficient, power):
         """
@@ -231,15 +388,9 @@ class Polynomial:
         Returns: a new Polynomial that is the product of multiplying
         this polynomial by (coefficient) * x^(power).
         """
-        # Replace with your code for part 3.C
-        mul_terms = {}
-#take the given power and coefficient and multiply it to each term in 
-#the given polynomial
-        poly_dict = self.get_terms()
-        for powe, coeff in poly_dict.items():
-            mul_terms[power + powe] = z256.mul(coefficient, coeff)
-        mul_poly = Polynomial(mul_terms)
-        return mul_poly
+        product = self._dense.copy()
+        product.imul_term(coefficient, power)
+        return Polynomial.from_dense(product)
 
     def add_polynomial(self, other_polynomial):
         """
@@ -250,14 +401,9 @@ class Polynomial:
 
         Returns: a new Polynomial that is the sum of both polynomials.
         """
-        # Replace with your code for part 4.A
-        poly_dict = self.get_terms()
-        added_poly = Polynomial(poly_dict)
-        poly2_terms = other_polynomial.get_terms()
-#add each term in the other polynomial to the given polynomial
-        for powe, coeff in poly2_terms.items():
-            added_poly = added_poly.add_term(coeff, powe)
-        return added_poly
+        added = self._dense.copy()
+        added.iadd_polynomial(other_polynomial._dense)
+        return Polynomial.from_dense(added)
         
     def subtract_polynomial(self, other_polynomial):
         """
@@ -268,14 +414,9 @@ class Polynomial:
 
         Returns: a new Polynomial that is the difference of both polynomials.
         """
-        # Replace with your code for part 4.B
-#similar to above
-        poly_dict = self.get_terms()
-        sub_poly = Polynomial(poly_dict)
-        poly2_terms = other_polynomial.get_terms()
-        for powe, coeff in poly2_terms.items():
-            sub_poly = sub_poly.add_term(coeff, powe)
-        return sub_poly
+        subtracted = self._dense.copy()
+        subtracted.isub_polynomial(other_polynomial._dense)
+        return Polynomial.from_dense(subtracted)
 
     def multiply_by_polynomial(self, other_polynomial):
         """
@@ -286,14 +427,9 @@ class Polynomial:
 
         Returns: a new Polynomial that is the product of both polynomials.
         """
-        # Replace with your code for part 4.C
-        mul_poly = Polynomial()
-        poly2_terms = other_polynomial.get_terms()
-#multiply each term of the other polynomial with the given polynomial
-#and add the products
-        for powe, coeff in poly2_terms.items():
-            mul_poly = mul_poly.add_polynomial(self.multiply_by_term(coeff, powe))
-        return mul_poly
+        product = self._dense.copy()
+        product.imul_polynomial(other_polynomial._dense)
+        return Polynomial.from_dense(product)
 
     def remainder(self, denominator):
         """
@@ -307,25 +443,9 @@ class Polynomial:
 
         Returns: a new polynomial that is the remainder
         """
-        # Replace with your code for part 4.D
-#track the current numerator used to be divided by the denominator
-        poly_dict = self.get_terms()
-        cur_nume = Polynomial(poly_dict)
-        n_degree = cur_nume.get_degree()
-        n_coeff = cur_nume.get_coefficient(n_degree)
-        d_degree = denominator.get_degree()
-        d_coeff = denominator.get_coefficient(d_degree)
-#keep dividing as long as the numerator's degree >= the denominator's degree
-        while n_degree >= d_degree:
-            quo = divide_terms(n_coeff, n_degree, d_coeff, d_degree)
-            next_cur = quo.multiply_by_polynomial(denominator)
-            cur_nume = cur_nume.subtract_polynomial(next_cur)
-            n_degree = cur_nume.get_degree()
-            n_coeff = cur_nume.get_coefficient(n_degree)
-#if the current numerator is 0 then the remainder of the division is 0
-            if n_coeff == 0:
-                return cur_nume
-        return cur_nume
+        remainder = self._dense.copy()
+        remainder.iremainder(denominator._dense)
+        return Polynomial.from_dense(remainder)
     
 def create_message_polynomial(message, num_correction_bytes):
     """
@@ -362,15 +482,9 @@ def create_generator_polynomial(num_correction_bytes):
 
     Returns: generator Polynomial for generating Reed-Solomon encoding data.
     """
-    # Replace with your code for part 5.B
-#follow the formula for generator polynomial
-    gen_poly = Polynomial({0: 1})
-    for idx in range(num_correction_bytes):
-        next_num = defaultdict(int)
-        next_num[1] = 1
-        next_num[0] += z256.power(2, idx)
-        gen_poly = gen_poly.multiply_by_polynomial(Polynomial(next_num))
-    return gen_poly
+    # The generators are built once and kept by gf256, highest power first
+    coeffs = gf256.generator(num_correction_bytes)
+    return Polynomial.from_dense(DensePolynomial(coeffs[::-1]))
 
 def reed_solomon_correction(encoded_data, num_correction_bytes):
     """
@@ -384,12 +498,69 @@ def reed_solomon_correction(encoded_data, num_correction_bytes):
     Returns: a polynomial that represents the Reed-Solomon error
     correction code for the input data.
     """
-    # Replace with your code for part 5.C
-#find the remainder of dividing the message by the generator polynomial 
-    msg_poly = create_message_polynomial(encoded_data, num_correction_bytes)
-    gen_poly = create_generator_polynomial(num_correction_bytes)
-    reed = msg_poly.remainder(gen_poly)
-    return reed
+    # The remainder of the message polynomial divided by the generator,
+    # computed directly from the bytes with gf256's shift register
+    ecc = gf256.rs_encode(bytes(encoded_data), num_correction_bytes)
+    return Polynomial.from_dense(DensePolynomial(ecc[::-1]))
+
+
+def reed_solomon_batch(blocks, num_correction_bytes, num_workers=None,
+                       chunk_size=4096):
+    """
+    Computes the Reed-Solomon error correction bytes of many blocks.
+
+    Blocks of the same length and number of error correction bytes are
+    grouped, split into chunks and encoded together by
+    gf256.rs_encode_batch across a pool of worker processes.
+
+    inputs:
+        - blocks: a list of bytes-like objects, each holding the data
+                  bytes of one block
+        - num_correction_bytes: an integer representing the number of
+                                error correction bytes of every block, or
+                                a list with one such integer per block
+        - num_workers: an integer representing the number of worker
+                       processes, None to use one per CPU, or 1 to
+                       compute everything in this process
+        - chunk_size: an integer representing the number of blocks
+                      encoded by each task
+
+    Returns: a two-element tuple containing a list of the bytes objects
+    of error correction bytes for each block, in the same order as
+    blocks, and the throughput in blocks per second.
+    """
+    if isinstance(num_correction_bytes, int):
+        num_correction_bytes = [num_correction_bytes] * len(blocks)
+    before = time.perf_counter()
+    groups = {}
+    for idx, block in enumerate(blocks):
+        key = (len(block), num_correction_bytes[idx])
+        groups.setdefault(key, []).append(idx)
+    tasks = []
+    for (_, num_bytes), indices in groups.items():
+        for start in range(0, len(indices), chunk_size):
+            chunk = indices[start:start + chunk_size]
+            tasks.append((chunk, [bytes(blocks[idx]) for idx in chunk], num_bytes))
+
+    ecc = [None] * len(blocks)
+    if num_workers == 1:
+        results = [gf256.rs_encode_batch(chunk_blocks, num_bytes)
+                   for _, chunk_blocks, num_bytes in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = pool.map(gf256.rs_encode_batch,
+                               [chunk_blocks for _, chunk_blocks, _ in tasks],
+                               [num_bytes for _, _, num_bytes in tasks])
+            results = list(results)
+    for (chunk, _, _), chunk_ecc in zip(tasks, results):
+        for idx, block_ecc in zip(chunk, chunk_ecc):
+            ecc[idx] = block_ecc
+    elapsed = time.perf_counter() - before
+    if elapsed > 0:
+        blocks_per_second = len(blocks) / elapsed
+    else:
+        blocks_per_second = float("inf")
+    return ecc, blocks_per_second
 
 
 # Uncomment the following line when you are ready to generate an
@@ -0,0 +1,66 @@
+"""
+Queue Microbenchmark
+
+Times push, pop and clear on the Queue classes of kevin_bacon and
+map_search for queues holding up to millions of items.
+"""
+
+import time
+import kevin_bacon
+import map_search
+
+def time_queue(queue_class, num_items):
+    """
+    Times each queue operation on a queue of the given size.
+
+    inputs:
+        - queue_class: a Queue class to time
+        - num_items: an integer representing the number of items to
+          push and pop
+
+    Returns: a dictionary mapping each operation ("push", "pop" and
+    "clear") to its average cost in nanoseconds per item.
+    """
+    queue = queue_class()
+    before = time.perf_counter()
+    for item in range(num_items):
+        queue.push(item)
+    push_time = time.perf_counter() - before
+
+    before = time.perf_counter()
+    for _ in range(num_items):
+        queue.pop()
+    pop_time = time.perf_counter() - before
+
+    for item in range(num_items):
+        queue.push(item)
+    before = time.perf_counter()
+    queue.clear()
+    clear_time = time.perf_counter() - before
+
+    return {"push": push_time * 1e9 / num_items,
+            "pop": pop_time * 1e9 / num_items,
+            "clear": clear_time * 1e9 / num_items}
+
+def run(sizes=(1000, 10000, 100000, 1000000, 4000000)):
+    """
+    Times both Queue classes at each size and prints a table of the
+    results.
+
+    input:
+        - sizes: a sequence of integers representing the queue sizes
+          to time
+    """
+    print("%-12s %10s %10s %10s %10s" % ("queue", "items", "push ns",
+                                        "pop ns", "clear ns"))
+    for name, queue_class in (("kevin_bacon", kevin_bacon.Queue),
+                              ("map_search", map_search.Queue)):
+        for num_items in sizes:
+            costs = time_queue(queue_class, num_items)
+            print("%-12s %10d %10.1f %10.1f %10.1f" % (name, num_items,
+                                                        costs["push"],
+                                                        costs["pop"],
+                                                        costs["clear"]))
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,24 @@
+"""
+Pregenerated Reed-Solomon Generator Polynomials
+
+Written by gf256.write_generator_module; do not edit.  Maps
+each number of error correction bytes k used by QR codes to the
+k + 1 coefficients of the product of (x - 2^i) for i < k,
+highest power first.
+"""
+
+GENERATORS = {
+    7: bytes.fromhex('017f7a9aa40b4475'),
+    10: bytes.fromhex('01d8c29f6fc75e5f719dc1'),
+    13: bytes.fromhex('018949e311b111340d2e2b538478'),
+    15: bytes.fromhex('011dc46fa3704a0a69698b849720861a'),
+    16: bytes.fromhex('013b0d68bd44d11e08a34129e56232243b'),
+    17: bytes.fromhex('01774253787716c553f9298f8655357d634f'),
+    18: bytes.fromhex('01effbb77195afc7d7f0dc4952ad4b2043d992'),
+    20: bytes.fromhex('0198b9f0056f6306dc70964524bb16e4c67979a5ae'),
+    22: bytes.fromhex('0159b383b0b6f413bd45281c891d7b43fd56dae61a91f5'),
+    24: bytes.fromhex('017a76a946b2edd8667396e54982483d2bce01edf77fd99075'),
+    26: bytes.fromhex('01f633b7048862c7984d38ce189128d175e92a87444690924d2b5e'),
+    28: bytes.fromhex('01fc091c0d12fbd09667ae6429a70cf7387577e97fb5647993b04a3ac5'),
+    30: bytes.fromhex('01d4f64d49c3c04b62054667b116d98a33b5f64819122ee44ad8c30b6a8296'),
+}